@@ -0,0 +1,51 @@
+import argparse
+import json
+import sys
+from oci_services import DEFAULT_CONFIG_FILE, DEFAULT_STATE_DIR, configure_logging, extract_tenancies, log_sinks
+
+def execute_batch():
+   parser = argparse.ArgumentParser( description='Extract several tenancies in parallel' )
+   parser.add_argument( 'targets', nargs='+', help='config profile, or instance:<profile> for instance principals with the PAR of that profile' )
+   parser.add_argument( '--processes', type=int, help='tenancies extracted at the same time' )
+   parser.add_argument( '--max-workers', type=int, help='concurrent API calls per tenancy' )
+   parser.add_argument( '--config-file', default=DEFAULT_CONFIG_FILE )
+   parser.add_argument( '--incremental', action='store_true' )
+   parser.add_argument( '--skip-unchanged', action='store_true', help='with --incremental, skip compartments whose resources look unchanged - renames and resizes there are missed for up to a day' )
+   parser.add_argument( '--journal', action='store_true', help='journal the listed units, so that --resume skips what a failed run finished' )
+   parser.add_argument( '--resume', help='summary printed by an earlier batch - its failed runs are resumed rather than started again' )
+   parser.add_argument( '--state-dir', default=DEFAULT_STATE_DIR, help='snapshots, metadata caches and journals, OCI_STATE_DIR or ~/.oci_python by default' )
+   parser.add_argument( '--log-sink', help=f'{", ".join( log_sinks )} or syslog:<host>:<port>, OCI_LOG_SINK or papertrail by default' )
+   args = parser.parse_args()
+
+   # the pool processes ship their records the same way
+   if args.log_sink:
+      configure_logging( args.log_sink )
+
+   # report_no of every failed run of the earlier batch, by target
+   resume = {}
+   if args.resume:
+      with open( args.resume ) as f:
+         resume = { s[ 'target' ]: s[ 'report_no' ] for s in json.load( f ) if ( s[ 'error' ] or s[ 'failed_uploads' ] ) and s[ 'report_no' ] }
+
+   targets = []
+   for target in args.targets:
+      authentication, _, profile = target.rpartition( ':' )
+
+      targets.append( { 'profile': profile,
+                        'authentication': 'INSTANCE' if authentication == 'instance' else 'CONFIG',
+                        'config_file': args.config_file,
+                        'max_workers': args.max_workers,
+                        'incremental': args.incremental,
+                        'skip_unchanged': args.skip_unchanged,
+                        'journal': args.journal,
+                        'state_dir': args.state_dir,
+                        'report_no': resume.get( profile if authentication != 'instance' else f'instance_{profile}' ) } )
+
+   summaries = extract_tenancies( targets, args.processes )
+   print( json.dumps( summaries, indent=3 ) )
+
+   if any( s[ 'error' ] or s[ 'failed_uploads' ] for s in summaries ):
+      sys.exit( 1 )
+
+if __name__ == '__main__':
+   execute_batch()
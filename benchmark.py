@@ -0,0 +1,166 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from mock_oci import MockOciServer, MockParServer
+
+##########################################################################
+# Offline benchmark - a full extract against a synthetic or recorded tenancy
+# served by mock_oci, uploading to a local PAR
+###########################################################################
+TENANCY_ID = 'ocid1.tenancy.oc1..mock'
+
+def write_config( directory, par_url, region_name ):
+   # throwaway API key - the mock only checks that requests are signed
+   key = rsa.generate_private_key( public_exponent=65537, key_size=2048 )
+   key_file = os.path.join( directory, 'key.pem' )
+   with open( key_file, 'wb' ) as f:
+      f.write( key.private_bytes( serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption() ) )
+
+   public = key.public_key().public_bytes( serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo )
+   fingerprint = ':'.join( f'{b:02x}' for b in hashlib.md5( public ).digest() )
+
+   config_file = os.path.join( directory, 'config' )
+   with open( config_file, 'w' ) as f:
+      f.write( f'[DEFAULT]\nuser=ocid1.user.oc1..mock\nfingerprint={fingerprint}\nkey_file={key_file}\ntenancy={TENANCY_ID}\nregion={region_name}\npar={par_url}\n' )
+
+   return config_file
+
+def run_extract( config_file, endpoint, options ):
+   # runs in a fresh process, so the peak RSS is the extract's alone
+   import oci_services
+
+   # throttling warnings of a benchmark do not belong in the remote log
+   oci_services.configure_logging( 'none' )
+
+   service = oci_services.OCIService( 'CONFIG', config_file=config_file, service_endpoint=endpoint, metadata_cache_path=None, journal_path=None,
+                                      max_workers=options[ 'max_workers' ], initial_rate=options[ 'initial_rate' ],
+                                      async_mode=options[ 'async_mode' ], output_formats=options[ 'formats' ], discovery=options[ 'discovery' ],
+                                      db_details=options[ 'db_details' ] )
+
+   # stdout carries the result alone
+   started = time.monotonic()
+   with contextlib.redirect_stdout( sys.stderr ):
+      failed = service.extract_data()
+   wall = time.monotonic() - started
+
+   profile = service.profiler.report()
+   return {
+      'wall_seconds': round( wall, 3 ),
+      'api_calls': sum( c[ 'calls' ] for c in profile[ 'calls' ] ),
+      'retries': sum( c[ 'retries' ] for c in profile[ 'calls' ] ),
+      'throttled': sum( c[ 'throttled' ] for c in profile[ 'calls' ] ),
+      'peak_rss_mb': round( resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss / 1024, 1 ),
+      'phases': profile[ 'phases' ],
+      'failed_uploads': failed,
+   }
+
+def benchmark( args ):
+   oci_server = MockOciServer( page_size=args.page_size, latency=args.latency, throttle_rate=args.throttle_rate ).start()
+   par_server = MockParServer().start()
+
+   try:
+      if args.dataset:
+         oci_server.load( args.dataset )
+         region_name = next( iter( oci_server.resources ) )[0]
+      else:
+         region_name = oci_server.populate( TENANCY_ID, args.regions, args.compartments, args.ads, args.instances, args.volumes, args.databases, args.limit_services, args.limits, args.occupancy )[0]
+
+      if args.save_dataset:
+         oci_server.save( args.save_dataset )
+
+      options = { 'max_workers': args.max_workers, 'initial_rate': args.initial_rate, 'async_mode': args.async_mode, 'formats': args.formats, 'discovery': args.discovery, 'db_details': args.db_details }
+      runs = []
+
+      with tempfile.TemporaryDirectory() as directory:
+         config_file = write_config( directory, par_server.par_url, region_name )
+
+         for n in range( args.repeat ):
+            oci_server.requests = 0
+            par_server.objects = {}
+
+            with multiprocessing.get_context( 'spawn' ).Pool( 1 ) as pool:
+               run = pool.apply( run_extract, ( config_file, oci_server.endpoint, options ) )
+
+            run[ 'mock_requests' ] = oci_server.requests
+            run[ 'upload_bytes' ] = sum( len( data ) for data in par_server.objects.values() )
+            run[ 'uploaded_files' ] = len( par_server.objects )
+            runs.append( run )
+
+      return { 'scale': { k: getattr( args, k ) for k in [ 'regions', 'compartments', 'ads', 'instances', 'volumes', 'databases', 'limit_services', 'limits', 'occupancy' ] },
+               'latency': args.latency, 'throttle_rate': args.throttle_rate, 'options': options,
+               'best': min( runs, key=lambda r: r[ 'wall_seconds' ] ), 'runs': runs }
+   finally:
+      oci_server.stop()
+      par_server.stop()
+
+def regressions( result, baseline, tolerance ):
+   # measures of the best run that grew by more than tolerance over the baseline
+   found = []
+   for measure in [ 'wall_seconds', 'api_calls', 'peak_rss_mb' ]:
+      was, now = baseline[ 'best' ][ measure ], result[ 'best' ][ measure ]
+      if was and now > was * ( 1 + tolerance ):
+         found.append( f'{measure} {was} -> {now}' )
+
+   for phase, was in baseline[ 'best' ][ 'phases' ].items():
+      now = result[ 'best' ][ 'phases' ].get( phase, 0 )
+      if was > 0.1 and now > was * ( 1 + tolerance ):
+         found.append( f'{phase} {was}s -> {now}s' )
+
+   return found
+
+def execute_benchmark():
+   parser = argparse.ArgumentParser( description='Benchmark an extract against a mock OCI backend' )
+   parser.add_argument( '--regions', type=int, default=2 )
+   parser.add_argument( '--compartments', type=int, default=20 )
+   parser.add_argument( '--ads', type=int, default=3 )
+   parser.add_argument( '--instances', type=int, default=5, help='per compartment and AD' )
+   parser.add_argument( '--volumes', type=int, default=5, help='per compartment and AD' )
+   parser.add_argument( '--databases', type=int, default=1, help='per compartment and AD' )
+   parser.add_argument( '--limit-services', type=int, default=10 )
+   parser.add_argument( '--limits', type=int, default=10, help='per service' )
+   parser.add_argument( '--occupancy', type=float, default=1.0, help='share of the compartments that hold resources' )
+   parser.add_argument( '--dataset', help='replay responses saved with --save-dataset instead of a synthetic tenancy' )
+   parser.add_argument( '--save-dataset' )
+   parser.add_argument( '--page-size', type=int, default=100 )
+   parser.add_argument( '--latency', type=float, default=0.02, help='seconds added to every API call' )
+   parser.add_argument( '--throttle-rate', type=float, default=0.0, help='share of API calls answered with 429' )
+   parser.add_argument( '--max-workers', type=int )
+   parser.add_argument( '--initial-rate', type=float )
+   parser.add_argument( '--async', dest='async_mode', action='store_true' )
+   parser.add_argument( '--formats', nargs='+', default=[ 'csv' ], choices=[ 'csv', 'parquet' ] )
+   parser.add_argument( '--discovery', action='store_true', help='only list where the resource search found resources' )
+   parser.add_argument( '--db-details', nargs='*', choices=[ 'dg_associations', 'backups' ], help='database detail tables to list, all by default' )
+   parser.add_argument( '--repeat', type=int, default=1 )
+   parser.add_argument( '--baseline', help='result of an earlier run to compare with' )
+   parser.add_argument( '--tolerance', type=float, default=0.2 )
+   parser.add_argument( '--output', help='file to write the result to' )
+   args = parser.parse_args()
+
+   result = benchmark( args )
+   print( json.dumps( result, indent=3 ) )
+
+   if args.output:
+      with open( args.output, 'w' ) as f:
+         json.dump( result, f, indent=3 )
+
+   if args.baseline:
+      with open( args.baseline ) as f:
+         found = regressions( result, json.load( f ), args.tolerance )
+
+      for regression in found:
+         print( f'regression : {regression}', file=sys.stderr )
+
+      if found:
+         sys.exit( 1 )
+
+if __name__ == '__main__':
+   execute_benchmark()
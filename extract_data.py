@@ -17,7 +17,13 @@ def execute_extract():
    else:
       authentication = "CONFIG"
 
+   # the report_no of a failed run resumes it
+   if len(sys.argv) > 3:
+      report_no = sys.argv[3]
+   else:
+      report_no = None
+
    oci_service = OCIService( authentication )
-   oci_service.extract_data()
+   oci_service.extract_data( report_no )
 
 execute_extract()
@@ -0,0 +1,355 @@
+import http
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+##########################################################################
+# Local stand-in for an Object Storage pre-authenticated request (PAR)
+#
+#   PUT    /p/<token>/<object>                            upload an object
+#   PUT    /p/<token>/<object>  (opc-multipart: true)     start a multipart upload
+#   PUT    /p/<token>/u/<object>/id/<upload>/<part>       upload a part
+#   POST   /p/<token>/u/<object>/id/<upload>/             commit
+#   DELETE /p/<token>/u/<object>/id/<upload>/             abort
+###########################################################################
+class ParHandler(BaseHTTPRequestHandler):
+   protocol_version = 'HTTP/1.1'
+
+   def log_message(self, format, *args):
+      pass
+
+   def reply(self, status, body=None):
+      data = json.dumps( body ).encode( 'utf-8' ) if body is not None else b''
+      self.send_response( status )
+      self.send_header( 'Content-Length', str( len( data ) ) )
+      if body is not None:
+         self.send_header( 'Content-Type', 'application/json' )
+      self.end_headers()
+      self.wfile.write( data )
+
+   def read_body(self):
+      return self.rfile.read( int( self.headers.get( 'Content-Length', 0 ) ) )
+
+   def injected_failure(self):
+      self.server.requests += 1
+      if random.random() < self.server.fail_rate:
+         self.server.failures += 1
+         self.reply( self.server.fail_status, { 'code': http.HTTPStatus( self.server.fail_status ).phrase.replace( ' ', '' ) } )
+         return True
+
+      return False
+
+   def upload_path(self):
+      # /p/<token>/u/<object>/id/<upload>/<part>
+      token, rest = self.path[ len( '/p/' ): ].split( '/u/', 1 )
+      object_name, rest = rest.split( '/id/', 1 )
+      upload_id, part = rest.split( '/', 1 )
+      return object_name, upload_id, part
+
+   def do_PUT(self):
+      body = self.read_body()
+      if self.injected_failure():
+         return
+
+      with self.server.lock:
+         self.server.bytes_received += len( body )
+
+         if '/u/' in self.path:
+            object_name, upload_id, part = self.upload_path()
+            self.server.uploads[ upload_id ][ int( part ) ] = body
+            return self.reply( 200 )
+
+         object_name = self.path.split( '/', 3 )[ 3 ]
+
+         if self.headers.get( 'opc-multipart' ) == 'true':
+            upload_id = str( uuid.uuid4() )
+            self.server.uploads[ upload_id ] = {}
+            token = self.path.split( '/' )[ 2 ]
+            return self.reply( 200, { 'uploadId': upload_id, 'objectName': object_name, 'accessUri': f'/p/{token}/u/{object_name}/id/{upload_id}/' } )
+
+         self.server.objects[ object_name ] = body
+         self.reply( 200 )
+
+   def do_POST(self):
+      self.read_body()
+      if self.injected_failure():
+         return
+
+      with self.server.lock:
+         object_name, upload_id, part = self.upload_path()
+         parts = self.server.uploads.pop( upload_id )
+         self.server.objects[ object_name ] = b''.join( parts[ n ] for n in sorted( parts ) )
+         self.reply( 200 )
+
+   def do_DELETE(self):
+      with self.server.lock:
+         object_name, upload_id, part = self.upload_path()
+         self.server.uploads.pop( upload_id, None )
+         self.reply( 204 )
+
+class MockParServer(ThreadingHTTPServer):
+   daemon_threads = True
+
+   # fail_rate of the uploads, commits and parts are answered with fail_status
+   def __init__(self, port=0, fail_rate=0.0, fail_status=503):
+      super().__init__( ( '127.0.0.1', port ), ParHandler )
+      self.fail_rate = fail_rate
+      self.fail_status = fail_status
+      self.objects = {}
+      self.uploads = {}
+      self.requests = 0
+      self.failures = 0
+      self.bytes_received = 0
+      self.lock = threading.Lock()
+
+   @property
+   def par_url(self):
+      return f'http://127.0.0.1:{self.server_port}/p/local/'
+
+   def start(self):
+      threading.Thread( target=self.serve_forever, daemon=True ).start()
+      return self
+
+   def stop(self):
+      self.shutdown()
+      self.server_close()
+
+##########################################################################
+# Local stand-in for the OCI list and get APIs
+#
+#   GET /<region>/<api version>/<collection>?<filters>&page=<offset>   one page of the matching records
+#   GET /<region>/<api version>/<collection>/<id>                      one record
+#   GET /<region>/<api version>/<parent>/<id>/<collection>             as the first, filtered on the parent id where it is in parents
+#   POST /<region>/<api version>/resources                             structured resource search
+#
+# Records are camelCase dicts as the services return them, filtered on every query parameter
+# they have a field of the same name for. Unsigned requests get 401
+###########################################################################
+class OciHandler(BaseHTTPRequestHandler):
+   protocol_version = 'HTTP/1.1'
+
+   def log_message(self, format, *args):
+      pass
+
+   def reply(self, status, body, headers=None):
+      data = json.dumps( body ).encode( 'utf-8' )
+      self.send_response( status )
+      self.send_header( 'Content-Type', 'application/json' )
+      self.send_header( 'Content-Length', str( len( data ) ) )
+      for name, value in ( headers or {} ).items():
+         self.send_header( name, value )
+      self.end_headers()
+      self.wfile.write( data )
+
+   def read_body(self):
+      return self.rfile.read( int( self.headers.get( 'Content-Length', 0 ) ) )
+
+   def do_GET(self):
+      self.handle_call( self.get )
+
+   def do_POST(self):
+      self.handle_call( self.search )
+
+   def handle_call(self, fn):
+      server = self.server
+      url = urllib.parse.urlsplit( self.path )
+      params = dict( urllib.parse.parse_qsl( url.query ) )
+      body = self.read_body()
+
+      region, *path = url.path.strip( '/' ).split( '/' )
+      if path and path[0].isdigit():
+         path = path[1:]
+
+      with server.lock:
+         server.requests += 1
+         server.in_flight += 1
+         server.peak_in_flight = max( server.peak_in_flight, server.in_flight )
+
+      try:
+         if server.latency:
+            time.sleep( server.latency )
+
+         if 'authorization' not in self.headers:
+            return self.reply( 401, { 'code': 'NotAuthenticated', 'message': 'The required information to complete authentication was not provided' } )
+
+         if random.random() < server.throttle_rate:
+            with server.lock:
+               server.throttled += 1
+            return self.reply( 429, { 'code': 'TooManyRequests', 'message': 'Too many requests for the user' }, { 'retry-after': '0' } )
+
+         fn( region, path, params, body )
+      finally:
+         with server.lock:
+            server.in_flight -= 1
+
+   def reply_page(self, records, params, wrapped=False):
+      offset = int( params.get( 'page', 0 ) )
+      limit = min( int( params.get( 'limit', self.server.page_size ) ), self.server.page_size )
+
+      headers = {}
+      if offset + limit < len( records ):
+         headers[ 'opc-next-page' ] = str( offset + limit )
+
+      page = records[ offset:offset + limit ]
+      self.reply( 200, { 'items': page } if wrapped else page, headers )
+
+   def get(self, region, path, params, body):
+      server = self.server
+
+      if len( path ) % 2 == 0:
+         collection, ocid = path[-2:]
+         record = next( ( r for r in server.resources.get( ( region, collection ), [] ) if r[ 'id' ] == ocid ), None )
+         if record is None:
+            return self.reply( 404, { 'code': 'NotAuthorizedOrNotFound', 'message': f'{ocid} not found' } )
+         return self.reply( 200, record )
+
+      collection = path[-1]
+      if collection in server.singletons:
+         return self.reply( 200, server.singletons[ collection ] )
+
+      if len( path ) > 1 and collection in server.parents:
+         params = dict( params, **{ server.parents[ collection ]: path[-2] } )
+
+      records = server.resources.get( ( region, collection ), [] )
+      matching = [ r for r in records if all( str( r[ name ] ) == value for name, value in params.items() if name in r ) ]
+      self.reply_page( matching, params, collection in server.wrapped )
+
+   def search(self, region, path, params, body):
+      # POST /<region>/<api version>/resources - structured search, 'query all resources' or 'query <type>, <type> resources'
+      query = json.loads( body or b'{}' ).get( 'query', '' )
+      match = re.match( r'\s*query\s+(.+?)\s+resources', query, re.IGNORECASE )
+      if not match:
+         return self.reply( 400, { 'code': 'InvalidParameter', 'message': f'cannot parse {query}' } )
+
+      types = { t.strip().lower() for t in match.group( 1 ).split( ',' ) }
+
+      resources = []
+      for collection, resource_type in self.server.searchable.items():
+         if 'all' not in types and resource_type.lower() not in types:
+            continue
+
+         for r in self.server.resources.get( ( region, collection ), [] ):
+            resources.append( { 'identifier': r[ 'id' ], 'resourceType': resource_type, 'compartmentId': r.get( 'compartmentId' ), 'availabilityDomain': r.get( 'availabilityDomain' ),
+                                'displayName': r.get( 'displayName' ), 'lifecycleState': r.get( 'lifecycleState' ), 'timeCreated': r.get( 'timeCreated' ) } )
+
+      self.reply_page( resources, params, wrapped=True )
+
+class MockOciServer(ThreadingHTTPServer):
+   daemon_threads = True
+   request_queue_size = 1024
+
+   # regions handed out by populate(), the SDK clients only accept known region names
+   region_names = [ 'us-ashburn-1', 'us-phoenix-1', 'eu-frankfurt-1', 'uk-london-1', 'ca-toronto-1', 'ap-tokyo-1', 'ap-sydney-1', 'sa-saopaulo-1',
+                    'ap-mumbai-1', 'eu-zurich-1', 'ap-seoul-1', 'eu-amsterdam-1' ]
+
+   # responses that are one object whatever is asked, and collections that are wrapped in items
+   singletons = { 'resourceAvailability': { 'used': 1, 'available': 9 } }
+   wrapped = { 'announcements' }
+
+   # collections listed under a parent record, with the field that holds the parent id
+   parents = { 'dataGuardAssociations': 'databaseId' }
+
+   # collections found by the resource search, with their resource type
+   searchable = { 'instances': 'Instance', 'dedicatedVmHosts': 'DedicatedVmHost', 'volumes': 'Volume', 'bootVolumes': 'BootVolume', 'dbSystems': 'DbSystem',
+                  'cloudVmClusters': 'CloudVmCluster', 'vmClusters': 'VmCluster', 'autonomousDatabases': 'AutonomousDatabase', 'autonomousContainerDatabases': 'AutonomousContainerDatabase', 'autonomousExadataInfrastructures': 'AutonomousExadataInfrastructure' }
+
+   def __init__(self, port=0, page_size=100, latency=0.0, throttle_rate=0.0):
+      super().__init__( ( '127.0.0.1', port ), OciHandler )
+      self.page_size = page_size
+      self.latency = latency
+      self.throttle_rate = throttle_rate
+      self.resources = {}
+      self.requests = 0
+      self.throttled = 0
+      self.in_flight = 0
+      self.peak_in_flight = 0
+      self.lock = threading.Lock()
+
+   @property
+   def endpoint(self):
+      return f'http://127.0.0.1:{self.server_port}'
+
+   def add(self, region_name, collection, records):
+      self.resources.setdefault( ( region_name, collection ), [] ).extend( records )
+
+   def populate(self, tenancy_id, regions=1, compartments=5, ads=3, instances=2, volumes=2, databases=1, limit_services=5, limits=10, occupancy=1.0):
+      # a synthetic tenancy - instances, volumes and databases are per compartment and AD of every region,
+      # in the first occupancy share of the compartments, the others are empty
+      region_names = self.region_names[ :regions ]
+      compartment_ids = [ f'ocid1.compartment.oc1..mock{n}' for n in range( compartments ) ]
+      home = { 'compartmentId': tenancy_id, 'lifecycleState': 'ACTIVE' }
+
+      for region_name in region_names:
+         self.add( region_name, 'tenancies', [ { 'id': tenancy_id, 'name': 'mock', 'description': 'synthetic tenancy', 'homeRegionKey': 'IAD' } ] )
+         self.add( region_name, 'regionSubscriptions', [ { 'regionKey': name.split( '-' )[1][ :3 ].upper(), 'regionName': name, 'status': 'READY', 'isHomeRegion': name == region_names[0] } for name in region_names ] )
+         self.add( region_name, 'compartments', [ dict( home, id=ocid, name=f'compartment-{n}', description='synthetic' ) for n, ocid in enumerate( compartment_ids ) ] )
+
+         ad_names = [ f'Mock:{region_name.upper()}-AD-{n + 1}' for n in range( ads ) ]
+         self.add( region_name, 'availabilityDomains', [ dict( home, id=f'ocid1.availabilitydomain.{region_name}.{n}', name=name ) for n, name in enumerate( ad_names ) ] )
+
+         self.add( region_name, 'services', [ { 'name': f'service-{s}', 'description': f'Service {s}' } for s in range( limit_services ) ] )
+         self.add( region_name, 'limitValues', [ { 'serviceName': f'service-{s}', 'name': f'limit-{n}', 'scopeType': 'REGION', 'availabilityDomain': None, 'value': 10 }
+                                                 for s in range( limit_services ) for n in range( limits ) ] )
+
+         self.add( region_name, 'announcements', [ { 'id': f'ocid1.announcement.{region_name}', 'announcementType': 'ACTION_RECOMMENDED', 'summary': 'synthetic', 'type': 'AnnouncementSummary',
+                                                     'affectedRegions': [ region_name ], 'services': [ 'Compute' ], 'lifecycleState': 'ACTIVE' } ] )
+
+         for compartment_id in compartment_ids[ :round( compartments * occupancy ) ]:
+            for ad_name in ad_names:
+               common = { 'compartmentId': compartment_id, 'availabilityDomain': ad_name, 'lifecycleState': 'AVAILABLE' }
+               prefix = f'{region_name}.{compartment_id.split( "." )[-1]}.{ad_name.split( "-" )[-1]}'
+
+               for n in range( instances ):
+                  ocid = f'{prefix}.{n}'
+                  self.add( region_name, 'instances', [ dict( common, id=f'ocid1.instance.{ocid}', displayName=f'instance-{n}', region=region_name, shape='VM.Standard2.1', lifecycleState='RUNNING' ) ] )
+                  self.add( region_name, 'bootVolumes', [ dict( common, id=f'ocid1.bootvolume.{ocid}', displayName=f'boot-{n}', sizeInGBs=47, sizeInMBs=48128 ) ] )
+                  self.add( region_name, 'bootVolumeAttachments', [ dict( common, id=f'ocid1.bootvolumeattachment.{ocid}', instanceId=f'ocid1.instance.{ocid}', bootVolumeId=f'ocid1.bootvolume.{ocid}', lifecycleState='ATTACHED' ) ] )
+
+               for n in range( volumes ):
+                  ocid = f'{prefix}.{n}'
+                  self.add( region_name, 'volumes', [ dict( common, id=f'ocid1.volume.{ocid}', displayName=f'volume-{n}', sizeInGBs=50, sizeInMBs=51200 ) ] )
+                  if n < instances:
+                     self.add( region_name, 'volumeAttachments', [ dict( common, id=f'ocid1.volumeattachment.{ocid}', attachmentType='iscsi', instanceId=f'ocid1.instance.{ocid}', volumeId=f'ocid1.volume.{ocid}', lifecycleState='ATTACHED' ) ] )
+
+               for n in range( databases ):
+                  ocid = f'{prefix}.{n}'
+                  self.add( region_name, 'dbSystems', [ dict( common, id=f'ocid1.dbsystem.{ocid}', displayName=f'dbsystem-{n}', shape='VM.Standard2.2', cpuCoreCount=2, databaseEdition='ENTERPRISE_EDITION' ) ] )
+                  self.add( region_name, 'dbHomes', [ dict( common, id=f'ocid1.dbhome.{ocid}', displayName=f'dbhome-{n}', dbSystemId=f'ocid1.dbsystem.{ocid}', dbVersion='19.0.0.0' ) ] )
+                  self.add( region_name, 'databases', [ dict( common, id=f'ocid1.database.{ocid}', dbHomeId=f'ocid1.dbhome.{ocid}', dbName=f'DB{n}', dbBackupConfig=None ) ] )
+                  self.add( region_name, 'backups', [ dict( common, id=f'ocid1.dbbackup.{ocid}', databaseId=f'ocid1.database.{ocid}', displayName=f'backup-{n}', type='INCREMENTAL',
+                                                            databaseSizeInGBs=256.0, timeStarted='2020-01-01T00:00:00.000Z', timeEnded='2020-01-01T01:00:00.000Z' ) ] )
+                  self.add( region_name, 'dataGuardAssociations', [ { 'id': f'ocid1.dgassociation.{ocid}', 'databaseId': f'ocid1.database.{ocid}', 'role': 'PRIMARY', 'lifecycleState': 'AVAILABLE',
+                                                                      'peerRole': 'STANDBY', 'peerDatabaseId': f'ocid1.database.{ocid}.standby', 'peerDbSystemId': f'ocid1.dbsystem.{ocid}.standby',
+                                                                      'protectionMode': 'MAXIMUM_PERFORMANCE', 'transportType': 'ASYNC', 'applyLag': '0 seconds',
+                                                                      'timeCreated': '2020-01-01T00:00:00.000Z' } ] )
+
+      return region_names
+
+   def save(self, path):
+      with open( path, 'w' ) as f:
+         json.dump( [ { 'region': region_name, 'collection': collection, 'records': records } for ( region_name, collection ), records in self.resources.items() ], f )
+
+   def load(self, path):
+      # responses saved by save(), or recorded elsewhere in the same shape
+      with open( path ) as f:
+         for entry in json.load( f ):
+            self.add( entry[ 'region' ], entry[ 'collection' ], entry[ 'records' ] )
+
+   def start(self):
+      threading.Thread( target=self.serve_forever, daemon=True ).start()
+      return self
+
+   def stop(self):
+      self.shutdown()
+      self.server_close()
+
+if __name__ == '__main__':
+   server = MockParServer( int( sys.argv[1] ) if len( sys.argv ) > 1 else 8080 )
+   print( f'PAR stand-in listening on {server.par_url}' )
+   server.serve_forever()
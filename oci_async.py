@@ -0,0 +1,333 @@
+import oci
+import asyncio
+import json
+import requests
+import string
+import time
+import urllib.parse
+from oci_services import BlockStorage, Collector, Compute, DBSystem, journal_key, logger, parse_retry_after, unit_key
+
+try:
+   import aiohttp
+   import yarl
+except ImportError:
+   aiohttp = None
+
+##########################################################################
+# REST operations of the list calls
+###########################################################################
+# client class, resource path and response type of every SDK list call the async collectors make
+operations = {
+   'list_dedicated_vm_hosts': ( oci.core.ComputeClient, '/dedicatedVmHosts', 'list[DedicatedVmHostSummary]' ),
+   'list_instances': ( oci.core.ComputeClient, '/instances', 'list[Instance]' ),
+   'list_volume_attachments': ( oci.core.ComputeClient, '/volumeAttachments', 'list[VolumeAttachment]' ),
+   'list_boot_volume_attachments': ( oci.core.ComputeClient, '/bootVolumeAttachments', 'list[BootVolumeAttachment]' ),
+   'list_volumes': ( oci.core.BlockstorageClient, '/volumes', 'list[Volume]' ),
+   'list_boot_volumes': ( oci.core.BlockstorageClient, '/bootVolumes', 'list[BootVolume]' ),
+   'list_db_systems': ( oci.database.DatabaseClient, '/dbSystems', 'list[DbSystemSummary]' ),
+   'list_db_homes': ( oci.database.DatabaseClient, '/dbHomes', 'list[DbHomeSummary]' ),
+   'list_databases': ( oci.database.DatabaseClient, '/databases', 'list[DatabaseSummary]' ),
+   'list_autonomous_exadata_infrastructures': ( oci.database.DatabaseClient, '/autonomousExadataInfrastructures', 'list[AutonomousExadataInfrastructureSummary]' ),
+   'list_autonomous_container_databases': ( oci.database.DatabaseClient, '/autonomousContainerDatabases', 'list[AutonomousContainerDatabaseSummary]' ),
+   'list_autonomous_databases': ( oci.database.DatabaseClient, '/autonomousDatabases', 'list[AutonomousDatabaseSummary]' ),
+   'list_backups': ( oci.database.DatabaseClient, '/backups', 'list[BackupSummary]' ),
+   'list_data_guard_associations': ( oci.database.DatabaseClient, '/databases/{databaseId}/dataGuardAssociations', 'list[DataGuardAssociationSummary]' ),
+}
+
+##########################################################################
+# Async fan-out
+###########################################################################
+class AsyncFanOut(object):
+   # signed REST calls on one event loop - thousands of list requests in flight on a single thread,
+   # paced by the same per (region, service) rate limits as the blocking fan-out
+   max_in_flight = 1000
+
+   def __init__(self, fan_out, signer, session):
+      self.fan_out = fan_out
+      self.rate_limits = fan_out.rate_limits
+      self.signer = signer
+      self.session = session
+
+   def url(self, client, path, params):
+      # the endpoint the SDK client would call, with its API version.
+      # Endpoints such as iaas.<region>.{dualStack?ds.oci.:}oraclecloud.com are templates the SDK resolves per request.
+      base_client = client.base_client
+      if hasattr( base_client, 'update_endpoint_template_for_options' ):
+         endpoint = base_client.update_endpoint_template_for_options()
+      else:
+         endpoint = base_client.endpoint
+
+      return f'{endpoint}{path}?{urllib.parse.urlencode( params )}'
+
+   def signed_headers(self, url):
+      # the SDK signers are requests auth handlers - sign a prepared request and send its headers
+      request = requests.Request( 'GET', url, headers={ 'accept': 'application/json' } ).prepare()
+      self.signer( request )
+      return dict( request.headers )
+
+   async def call(self, region_name, operation, **params):
+      # returns the deserialized page and the opc-next-page token
+      client_class, path, response_type = operations[ operation ]
+
+      # parameters named in the path go into it, the rest into the query
+      path_params = [ name for _, name, _, _ in string.Formatter().parse( path ) if name ]
+      path = path.format( **{ name: urllib.parse.quote( params.pop( name ), safe='' ) for name in path_params } )
+
+      client = self.fan_out.client( client_class, self.signer, region_name )
+      limiter = self.rate_limits.get( region_name, client_class.__name__ )
+      url = self.url( client, path, params )
+
+      for attempt in range( self.rate_limits.max_retries + 1 ):
+         wait = limiter.reserve()
+         while wait:
+            await asyncio.sleep( wait )
+            wait = limiter.reserve()
+
+         started = time.monotonic()
+         try:
+            async with self.session.get( yarl.URL( url, encoded=True ), headers=self.signed_headers( url ) ) as response:
+               body = await response.read()
+               status = response.status
+               headers = dict( response.headers )
+         except Exception:
+            self.rate_limits.profiler.call( client_class.__name__, operation, region_name, time.monotonic() - started, None, retry=attempt > 0 )
+            raise
+
+         self.rate_limits.profiler.call( client_class.__name__, operation, region_name, time.monotonic() - started, status, len( body ), attempt > 0 )
+
+         if status == 429 and attempt < self.rate_limits.max_retries:
+            limiter.throttled( parse_retry_after( headers ), started )
+            logger.warning( f'{client_class.__name__}.{operation} throttled in {region_name}, rate now {limiter.rate:.2f}/s' )
+
+            await asyncio.sleep( self.rate_limits.backoff( attempt ) )
+            continue
+
+         if status >= 300:
+            try:
+               error = json.loads( body )
+            except ValueError:
+               error = {}
+
+            raise oci.exceptions.ServiceError( status, error.get( 'code' ), headers, error.get( 'message', body.decode( 'utf-8', 'replace' ) ) )
+
+         limiter.success()
+         return client.base_client.deserialize_response_data( body, response_type ), headers.get( 'opc-next-page' )
+
+   async def pages(self, region_name, operation, **params):
+      while True:
+         page, next_page = await self.call( region_name, operation, **params )
+         yield page
+
+         if not next_page:
+            return
+
+         params[ 'page' ] = next_page
+
+   async def stream(self, fn, units, queue_size=4):
+      # as FanOut.stream - (unit, page) in the order of units, every unit listed by its own task
+      units = list( units )
+      queues = [ asyncio.Queue( queue_size ) for unit in units ]
+
+      async def run( unit, q ):
+         try:
+            async for page in fn( unit ):
+               await q.put( ( 'page', page ) )
+
+            await q.put( ( 'done', None ) )
+         except Exception as e:
+            await q.put( ( 'error', e ) )
+
+      tasks = [ asyncio.ensure_future( run( unit, q ) ) for unit, q in zip( units, queues ) ]
+      try:
+         for unit, q in zip( units, queues ):
+            while True:
+               kind, item = await q.get()
+               if kind == 'page':
+                  yield unit, item
+               elif kind == 'error':
+                  raise item
+               else:
+                  break
+      finally:
+         for task in tasks:
+            task.cancel()
+
+         await asyncio.gather( *tasks, return_exceptions=True )
+
+##########################################################################
+# Async collectors - the tables of the blocking collectors, listed on the event loop
+###########################################################################
+class AsyncCollector(Collector):
+   compartment_resources = None
+   ad_resources = None
+
+   def __init__(self, tenancy, fan_out, output=None):
+      self.tenancy = tenancy
+      self.tenancy_id = tenancy.tenancy_id
+      self.init_tables()
+      self.output = output
+      self.fan_out = fan_out
+
+   def context(self):
+      return { 'tenancy_id': self.tenancy_id }
+
+   def journal_name(self, fn):
+      # the units of a run can be resumed in either mode
+      return f'{type( self ).__name__[ len( "Async" ): ]}.{fn.__name__}'
+
+   async def stream(self, fn, units):
+      # as Collector.stream, on the event loop
+      journal = self.fan_out.fan_out.journal
+      if journal is None:
+         async for unit, ( table, page ) in self.fan_out.stream( fn, units ):
+            yield unit, table, self.publish( table, page, unit_key( unit[0], unit[1] ) )
+         return
+
+      name = self.journal_name( fn )
+      replayed, units = self.replay( journal, name, units, lambda unit: unit_key( unit[0], unit[1] ) )
+      for unit, table, rows in replayed:
+         yield unit, table, rows
+
+      current, listed = None, {}
+      async for unit, ( table, page ) in self.fan_out.stream( fn, units ):
+         if unit is not current:
+            if current is not None:
+               journal.record( name, journal_key( current ), listed )
+            current, listed = unit, {}
+
+         rows = self.publish( table, page, unit_key( unit[0], unit[1] ) )
+         listed.setdefault( table, [] ).extend( rows )
+         yield unit, table, rows
+
+      if current is not None:
+         journal.record( name, journal_key( current ), listed )
+
+   async def list_units(self, fn, units):
+      async for unit, table, rows in self.stream( fn, units ):
+         pass
+
+   async def collect(self):
+      await self.list_units( self.list_compartment, self.fan_out.fan_out.compartment_units( self.tenancy, self.compartment_resources ) )
+
+      if hasattr( self, 'list_ad' ):
+         await self.list_units( self.list_ad, self.fan_out.fan_out.ad_units( self.tenancy, self.ad_resources ) )
+
+class AsyncCompute(AsyncCollector):
+   tables = Compute.tables
+   compartment_resources = Compute.compartment_resources
+   ad_resources = Compute.ad_resources
+
+   async def list_compartment(self, unit):
+      region, c = unit
+
+      for operation, table in [ ( 'list_dedicated_vm_hosts', 'dedicated_hosts' ), ( 'list_instances', 'instances' ), ( 'list_volume_attachments', 'vol_attachments' ) ]:
+         async for page in self.fan_out.pages( region.region_name, operation, compartmentId=c.id ):
+            yield table, page
+
+   async def list_ad(self, unit):
+      region, c, ad = unit
+
+      async for page in self.fan_out.pages( region.region_name, 'list_boot_volume_attachments', availabilityDomain=ad.name, compartmentId=c.id ):
+         yield 'bv_attachments', page
+
+class AsyncBlockStorage(AsyncCollector):
+   tables = BlockStorage.tables
+   compartment_resources = BlockStorage.compartment_resources
+   ad_resources = BlockStorage.ad_resources
+
+   async def list_compartment(self, unit):
+      region, c = unit
+
+      async for page in self.fan_out.pages( region.region_name, 'list_volumes', compartmentId=c.id ):
+         yield 'block_volumes', page
+
+   async def list_ad(self, unit):
+      region, c, ad = unit
+
+      async for page in self.fan_out.pages( region.region_name, 'list_boot_volumes', availabilityDomain=ad.name, compartmentId=c.id ):
+         yield 'boot_volumes', page
+
+class AsyncDBSystem(AsyncCollector):
+   tables = DBSystem.tables
+   compartment_resources = DBSystem.compartment_resources
+   optional_tables = DBSystem.optional_tables
+   details = DBSystem.details
+
+   def __init__(self, tenancy, fan_out, output=None, details=None):
+      super().__init__( tenancy, fan_out, output )
+
+      if details is not None:
+         self.details = set( details )
+
+   async def collect(self):
+      # as DBSystem - homes by compartment, then databases by home, then the detail tables
+      units = self.fan_out.fan_out.compartment_units( self.tenancy, self.compartment_resources )
+
+      homes = []
+      async for ( region, c ), table, rows in self.stream( self.list_compartment, units ):
+         if table == 'db_homes':
+            homes += [ ( region, c, db_home.id ) for db_home in rows ]
+
+      databases = []
+      async for ( region, c, db_home_id ), table, rows in self.stream( self.list_home, homes ):
+         databases += [ ( region, c, db.id ) for db in rows ]
+
+      if 'backups' in self.details:
+         compartments = { unit_key( region, c ): ( region, c ) for region, c, database_id in databases }
+         await self.list_units( self.list_backups, list( compartments.values() ) )
+
+      if 'dg_associations' in self.details:
+         await self.list_units( self.list_dg_associations, databases )
+
+   async def list_compartment(self, unit):
+      region, c = unit
+
+      for operation, table in [ ( 'list_db_systems', 'db_systems' ), ( 'list_db_homes', 'db_homes' ), ( 'list_autonomous_exadata_infrastructures', 'autonomous_exadata' ),
+                                ( 'list_autonomous_container_databases', 'autonomous_cdb' ), ( 'list_autonomous_databases', 'autonomous_db' ) ]:
+         async for page in self.fan_out.pages( region.region_name, operation, compartmentId=c.id ):
+            yield table, page
+
+   async def list_home(self, unit):
+      region, c, db_home_id = unit
+
+      async for page in self.fan_out.pages( region.region_name, 'list_databases', compartmentId=c.id, dbHomeId=db_home_id ):
+         yield 'databases', page
+
+   async def list_backups(self, unit):
+      region, c = unit
+
+      async for page in self.fan_out.pages( region.region_name, 'list_backups', compartmentId=c.id ):
+         yield 'backups', page
+
+   async def list_dg_associations(self, unit):
+      region, c, database_id = unit
+
+      async for page in self.fan_out.pages( region.region_name, 'list_data_guard_associations', databaseId=database_id ):
+         yield 'dg_associations', page
+
+async def collect_async( tenancy, signer, fan_out, output=None, max_in_flight=None, db_details=None ):
+   connector = aiohttp.TCPConnector( limit=max_in_flight or AsyncFanOut.max_in_flight )
+
+   async with aiohttp.ClientSession( connector=connector ) as session:
+      async_fan_out = AsyncFanOut( fan_out, signer, session )
+
+      collectors = []
+      for collector_class, kwargs in [ ( AsyncCompute, {} ), ( AsyncBlockStorage, {} ), ( AsyncDBSystem, { 'details': db_details } ) ]:
+         with fan_out.rate_limits.profiler.phase( collector_class.__name__ ):
+            collector = collector_class( tenancy, async_fan_out, output, **kwargs )
+            await collector.collect()
+
+            # the files of a finished collector are uploaded while the next one is listing
+            if output is not None:
+               collector.create_csv()
+
+         collectors.append( collector )
+
+      return collectors
+
+def collect( tenancy, signer, fan_out, output=None, max_in_flight=None, db_details=None ):
+   # runs the compute, block storage and database collectors on an event loop of their own
+   if aiohttp is None:
+      raise ImportError( 'the async collection mode needs aiohttp - pip install aiohttp' )
+
+   return asyncio.run( collect_async( tenancy, signer, fan_out, output, max_in_flight, db_details ) )
@@ -1,68 +1,1399 @@
 import oci
+import atexit
+import collections
+import contextlib
+import copy
+import csv
+import datetime
+import email.utils
+import hashlib
+import io
+import json
+import os
+import random
+import re
 import time
 import requests
 import logging
+import pickle
 import socket
 import sys
-from logging.handlers import SysLogHandler
+import queue
+import shelve
+import sqlite3
+import tempfile
+import threading
+import urllib.parse
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
 
-config = None
-signer = None
-report_no = None
-par_url = None
+try:
+   import pyarrow
+   import pyarrow.parquet
+except ImportError:
+   pyarrow = None
 
 try:
   app_name = sys.argv[2]
 except Exception:
    app_name = 'NONE'
 
-syslog = SysLogHandler(address=( 'logs.papertrailapp.com', 26941))
 format = f'%(asctime)s {app_name}: %(levelname)s : %(lineno)d : %(message)s'
 formatter = logging.Formatter(format, datefmt='%b %d %H:%M:%S')
-syslog.setFormatter(formatter)
 
 logger = logging.getLogger()
-logger.addHandler(syslog)
 logger.setLevel(logging.WARNING)
 
+##########################################################################
+# Log shipping
+###########################################################################
+# where the records go - a sink is only built on the shipping thread, when the first records are shipped,
+# so nothing is resolved or connected at import
+log_sinks = {
+   'papertrail': lambda: SysLogHandler( address=( 'logs.papertrailapp.com', 26941 ) ),
+   'local': lambda: logging.StreamHandler( sys.stderr ),
+   'none': logging.NullHandler,
+}
+
+class DroppingQueueHandler(QueueHandler):
+   # never blocks the thread that logs - with the buffer full, the oldest record waiting ('oldest') or the new one ('newest') is dropped
+   def __init__(self, q, drop='oldest'):
+      super().__init__( q )
+      self.drop = drop
+      self.dropped = 0
+
+   def enqueue(self, record):
+      while True:
+         try:
+            self.queue.put_nowait( record )
+            return
+         except queue.Full:
+            self.dropped += 1
+
+         if self.drop != 'oldest':
+            return
+
+         try:
+            self.queue.get_nowait()
+         except queue.Empty:
+            pass
+
+class BatchingQueueListener(QueueListener):
+   # ships up to batch_size records at a time - those that arrive within flush_interval of the first - and
+   # reports how many records were dropped since the last batch.
+   # stop() is an event rather than a sentinel in the queue, which a full buffer could drop
+   poll_interval = 0.1
+   def __init__(self, q, sink, queue_handler, batch_size=100, flush_interval=1.0):
+      super().__init__( q )
+      self.sink = sink
+      self.queue_handler = queue_handler
+      self.batch_size = batch_size
+      self.flush_interval = flush_interval
+      self.stopped = threading.Event()
+      self.left = 0
+      self.reported = 0
+
+   def open_sink(self):
+      if isinstance( self.sink, logging.Handler ):
+         handler = self.sink
+      elif self.sink.startswith( 'syslog:' ):
+         host, port = self.sink[ len( 'syslog:' ): ].rsplit( ':', 1 )
+         handler = SysLogHandler( address=( host, int( port ) ) )
+      else:
+         handler = log_sinks[ self.sink ]()
+
+      handler.setFormatter( formatter )
+      return handler
+
+   def dequeue(self, block):
+      # a batch, or the sentinel once stop() was called and what was buffered then is shipped
+      while True:
+         if self.stopped.is_set():
+            return self.drain()
+
+         try:
+            record = self.queue.get( timeout=self.poll_interval )
+            break
+         except queue.Empty:
+            pass
+
+      batch = [ record ]
+      deadline = time.monotonic() + self.flush_interval
+
+      while len( batch ) < self.batch_size and not self.stopped.is_set():
+         remaining = deadline - time.monotonic()
+         if remaining <= 0:
+            break
+
+         try:
+            batch.append( self.queue.get( timeout=min( remaining, self.poll_interval ) ) )
+         except queue.Empty:
+            pass
+
+      return batch
+
+   def drain(self):
+      # the records buffered when stop() was called, a batch at a time - whatever is logged after them is left
+      batch = []
+      while self.left > 0 and len( batch ) < self.batch_size:
+         try:
+            batch.append( self.queue.get_nowait() )
+         except queue.Empty:
+            self.left = 0
+            break
+
+         self.left -= 1
+
+      return batch or self._sentinel
+
+   def handle(self, batch):
+      if not self.handlers:
+         try:
+            self.handlers = ( self.open_sink(), )
+         except OSError as e:
+            print( f'log sink {self.sink} is not available, logging locally : {e}', file=sys.stderr )
+            self.handlers = ( log_sinks[ 'local' ](), )
+            self.handlers[0].setFormatter( formatter )
+
+      dropped = self.queue_handler.dropped - self.reported
+      if dropped:
+         self.reported += dropped
+         batch.append( logging.makeLogRecord( { 'levelno': logging.WARNING, 'levelname': 'WARNING', 'msg': f'{dropped} log records dropped, the log buffer was full' } ) )
+
+      for record in batch:
+         super().handle( record )
+
+      for handler in self.handlers:
+         handler.flush()
+
+   def start(self):
+      self._thread = threading.Thread( target=self.ship, daemon=True )
+      self._thread.start()
+
+   def ship(self):
+      while True:
+         batch = self.dequeue( True )
+         if batch is self._sentinel:
+            return
+
+         self.handle( batch )
+
+   def stop(self):
+      self.left = self.queue.qsize()
+      self.stopped.set()
+
+      self._thread.join()
+      self._thread = None
+
+      for handler in self.handlers:
+         handler.close()
+
+log_listener = None
+log_settings = {}
+
+def configure_logging( sink=None, queue_size=10000, drop='oldest', batch_size=100, flush_interval=1.0 ):
+   # replaces how the records of the root logger are shipped - sink is a name of log_sinks, 'syslog:<host>:<port>' or a handler,
+   # by default the OCI_LOG_SINK environment variable or papertrail
+   global log_listener, log_settings
+
+   stop_logging()
+   log_settings = { 'sink': sink, 'queue_size': queue_size, 'drop': drop, 'batch_size': batch_size, 'flush_interval': flush_interval }
+
+   q = queue.Queue( queue_size )
+   queue_handler = DroppingQueueHandler( q, drop )
+   log_listener = BatchingQueueListener( q, sink or os.environ.get( 'OCI_LOG_SINK', 'papertrail' ), queue_handler, batch_size, flush_interval )
+
+   logger.addHandler( queue_handler )
+   log_listener.start()
+   return log_listener
+
+def stop_logging():
+   # ships what is still buffered
+   global log_listener
+
+   if log_listener is not None:
+      logger.removeHandler( log_listener.queue_handler )
+      log_listener.stop()
+      log_listener = None
+
+def reopen_logging():
+   # a forked process has the buffer, but not the thread that empties it
+   global log_listener
+
+   if log_listener is not None:
+      logger.removeHandler( log_listener.queue_handler )
+      log_listener = None
+      configure_logging( **log_settings )
+
+configure_logging()
+atexit.register( stop_logging )
+os.register_at_fork( after_in_child=reopen_logging )
+
 def my_handler(type, value, tb):
     logger.exception('Uncaught exception: {0}'.format(str(value)))
 
 # Install exception handler
 sys.excepthook = my_handler
 
+##########################################################################
+# Per-region clients
+###########################################################################
+clients = threading.local()
+
+def region_signer( signer, region_name ):
+   # copy the signer instead of mutating the shared one, so regions can run side by side
+   region_signer = copy.copy( signer )
+   region_signer.region = region_name
+   return region_signer
+
+def get_client( client_class, signer, region_name, endpoint=None, config=None ):
+   # SDK clients are not thread safe - every worker thread keeps its own client per region.
+   # Clients are dropped together with the signer they were made for.
+   # With an endpoint every service of the region is called at <endpoint>/<region>, e.g. a local mock.
+   # config is the loaded config - the SDK validates it for API key signers
+   if not hasattr( clients, 'cache' ):
+      clients.cache = weakref.WeakKeyDictionary()
+
+   cache = clients.cache.setdefault( signer, {} )
+
+   key = ( client_class, region_name, endpoint )
+   if key not in cache:
+      kwargs = { 'service_endpoint': f'{endpoint}/{region_name}' } if endpoint else {}
+      client = client_class( config=dict( config or {}, region=region_name ), signer=region_signer( signer, region_name ), **kwargs )
+      client.limiter_key = ( region_name, client_class.__name__ )
+      cache[ key ] = client
+
+   return cache[ key ]
+
+##########################################################################
+# Adaptive rate limiting
+###########################################################################
+class RateLimiter(object):
+   # token bucket for one (region, service) - additive increase while calls succeed, halved on a 429.
+   # The 429s of requests sent before the last decrease answer the rate that was already halved, they do not halve it again
+   initial_rate = 10.0
+   min_rate = 0.5
+   max_rate = 50.0
+   additive_increase = 1.0
+
+   def __init__(self, rate=None):
+      self.rate = rate or self.initial_rate
+      self.tokens = 1.0
+      self.updated = time.monotonic()
+      self.blocked_until = 0.0
+      self.decreased = float( '-inf' )
+      self.lock = threading.Lock()
+
+   def reserve(self):
+      # takes a token and returns 0, or returns how long to wait before asking again
+      with self.lock:
+         now = time.monotonic()
+         self.tokens = min( max( self.rate, 1.0 ), self.tokens + ( now - self.updated ) * self.rate )
+         self.updated = now
+
+         if self.blocked_until > now:
+            return self.blocked_until - now
+
+         if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0
+
+         return ( 1.0 - self.tokens ) / self.rate
+
+   def acquire(self):
+      while True:
+         wait = self.reserve()
+         if not wait:
+            return
+
+         time.sleep( wait )
+
+   def success(self):
+      with self.lock:
+         # grows by about additive_increase requests/second for every second of successful calls
+         self.rate = min( self.max_rate, self.rate + self.additive_increase / self.rate )
+
+   def throttled(self, retry_after=None, sent=None):
+      # sent is the time.monotonic() the throttled request went out at
+      with self.lock:
+         if sent is None or sent >= self.decreased:
+            self.rate = max( self.min_rate, self.rate / 2 )
+            self.tokens = 0.0
+            self.decreased = time.monotonic()
+
+         if retry_after:
+            self.blocked_until = max( self.blocked_until, time.monotonic() + retry_after )
+
+class RateLimits(object):
+   # one RateLimiter per (region, service), shared by every collector
+   max_retries = 8
+   base_backoff = 0.5
+   max_backoff = 60.0
+
+   def __init__(self, initial_rate=None, profiler=None):
+      self.initial_rate = initial_rate
+      self.profiler = profiler or Profiler()
+      self.limiters = {}
+      self.lock = threading.Lock()
+
+   def get(self, region_name, service):
+      with self.lock:
+         key = ( region_name, service )
+         if key not in self.limiters:
+            self.limiters[ key ] = RateLimiter( self.initial_rate )
+
+         return self.limiters[ key ]
+
+   def set_rate(self, region_name, service, rate):
+      self.get( region_name, service ).rate = rate
+
+   def rates(self):
+      with self.lock:
+         return { key: limiter.rate for key, limiter in self.limiters.items() }
+
+   def backoff(self, attempt):
+      # full jitter exponential backoff
+      return random.uniform( 0, min( self.max_backoff, self.base_backoff * 2 ** attempt ) )
+
+   def call(self, fn, *args, **kwargs):
+      region_name, service = fn.__self__.limiter_key
+      limiter = self.get( region_name, service )
+
+      for attempt in range( self.max_retries + 1 ):
+         limiter.acquire()
+         started = time.monotonic()
+
+         try:
+            response = fn( *args, **kwargs )
+         except oci.exceptions.ServiceError as e:
+            self.profiler.call( service, fn.__name__, region_name, time.monotonic() - started, e.status, retry=attempt > 0 )
+            if e.status != 429 or attempt == self.max_retries:
+               raise
+
+            retry_after = parse_retry_after( e.headers )
+            limiter.throttled( retry_after, started )
+            logger.warning( f'{service}.{fn.__name__} throttled in {region_name}, rate now {limiter.rate:.2f}/s' )
+
+            time.sleep( self.backoff( attempt ) )
+            continue
+         except Exception:
+            self.profiler.call( service, fn.__name__, region_name, time.monotonic() - started, None, retry=attempt > 0 )
+            raise
+
+         self.profiler.call( service, fn.__name__, region_name, time.monotonic() - started, response.status, int( response.headers.get( 'content-length', 0 ) ), attempt > 0 )
+         limiter.success()
+         return response
+
+def parse_retry_after( headers ):
+   value = ( headers or {} ).get( 'retry-after' ) or ( headers or {} ).get( 'Retry-After' )
+   if not value:
+      return None
+
+   try:
+      return float( value )
+   except ValueError:
+      pass
+
+   try:
+      return max( 0.0, email.utils.parsedate_to_datetime( value ).timestamp() - time.time() )
+   except ( TypeError, ValueError ):
+      return None
+
+##########################################################################
+# Run profile
+###########################################################################
+class CallStats(object):
+   # latency histogram and counters of one (service, operation, region)
+   buckets = [ 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0 ]
+
+   def __init__(self):
+      self.counts = [ 0 ] * ( len( self.buckets ) + 1 )
+      self.calls = 0
+      self.seconds = 0.0
+      self.max_seconds = 0.0
+      self.retries = 0
+      self.throttled = 0
+      self.errors = 0
+      self.bytes = 0
+
+   def add(self, seconds, status, size, retry):
+      self.counts[ next( ( i for i, bound in enumerate( self.buckets ) if seconds <= bound ), len( self.buckets ) ) ] += 1
+      self.calls += 1
+      self.seconds += seconds
+      self.max_seconds = max( self.max_seconds, seconds )
+      self.retries += retry
+      self.throttled += status == 429
+      self.errors += status is None or status >= 400
+      self.bytes += size
+
+   def report(self):
+      return { 'calls': self.calls, 'seconds': round( self.seconds, 3 ), 'max_seconds': round( self.max_seconds, 3 ), 'retries': self.retries, 'throttled': self.throttled, 'errors': self.errors, 'bytes': self.bytes,
+               'histogram': { str( bound ): count for bound, count in zip( self.buckets + [ '+Inf' ], self.counts ) } }
+
+class Profiler(object):
+   # every API call, attempt by attempt, with the timings of the collector phases and of the uploads
+   def __init__(self):
+      self.calls = {}
+      self.phases = {}
+      self.uploads = []
+      self.started = time.time()
+      self.lock = threading.Lock()
+
+   def call(self, service, operation, region_name, seconds, status, size=0, retry=False):
+      # status is None when the call failed without a response
+      with self.lock:
+         self.calls.setdefault( ( service, operation, region_name ), CallStats() ).add( seconds, status, size, retry )
+
+   @contextlib.contextmanager
+   def phase(self, name):
+      started = time.monotonic()
+      try:
+         yield
+      finally:
+         with self.lock:
+            self.phases[ name ] = self.phases.get( name, 0.0 ) + time.monotonic() - started
+
+   def upload(self, object_name, seconds, size, ok):
+      with self.lock:
+         self.uploads.append( { 'object_name': object_name, 'seconds': round( seconds, 3 ), 'bytes': size, 'ok': ok } )
+
+   def report(self):
+      with self.lock:
+         return {
+            'started': time.strftime( '%Y-%m-%dT%H:%M:%SZ', time.gmtime( self.started ) ),
+            'seconds': round( time.time() - self.started, 3 ),
+            'phases': { name: round( seconds, 3 ) for name, seconds in self.phases.items() },
+            'calls': [ dict( service=service, operation=operation, region=region_name, **stats.report() ) for ( service, operation, region_name ), stats in sorted( self.calls.items() ) ],
+            'uploads': list( self.uploads ),
+         }
+
+   def prometheus(self):
+      # Prometheus text exposition format, e.g. for the node exporter textfile collector
+      lines = []
+      metrics = [ ( 'calls', 'oci_api_calls_total', 'API call attempts' ), ( 'retries', 'oci_api_retries_total', 'attempts that were retries' ),
+                  ( 'throttled', 'oci_api_throttled_total', 'attempts answered with 429' ), ( 'errors', 'oci_api_errors_total', 'attempts that failed' ),
+                  ( 'bytes', 'oci_api_response_bytes_total', 'response bytes' ) ]
+
+      with self.lock:
+         calls = sorted( self.calls.items() )
+
+         lines += [ '# HELP oci_api_call_duration_seconds latency of the API calls', '# TYPE oci_api_call_duration_seconds histogram' ]
+         for ( service, operation, region_name ), stats in calls:
+            labels = f'service="{service}",operation="{operation}",region="{region_name}"'
+            cumulative = 0
+            for bound, count in zip( stats.buckets + [ '+Inf' ], stats.counts ):
+               cumulative += count
+               lines.append( f'oci_api_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}' )
+
+            lines.append( f'oci_api_call_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}' )
+            lines.append( f'oci_api_call_duration_seconds_count{{{labels}}} {stats.calls}' )
+
+         for attribute, name, help in metrics:
+            lines += [ f'# HELP {name} {help}', f'# TYPE {name} counter' ]
+            for ( service, operation, region_name ), stats in calls:
+               lines.append( f'{name}{{service="{service}",operation="{operation}",region="{region_name}"}} {getattr( stats, attribute )}' )
+
+         lines += [ '# HELP oci_phase_duration_seconds wall time of the collector phases', '# TYPE oci_phase_duration_seconds gauge' ]
+         lines += [ f'oci_phase_duration_seconds{{phase="{name}"}} {seconds:.6f}' for name, seconds in self.phases.items() ]
+
+         lines += [ '# HELP oci_uploads_total uploaded files', '# TYPE oci_uploads_total counter' ]
+         lines.append( f'oci_uploads_total{{result="ok"}} {sum( u[ "ok" ] for u in self.uploads )}' )
+         lines.append( f'oci_uploads_total{{result="failed"}} {sum( not u[ "ok" ] for u in self.uploads )}' )
+         lines += [ '# HELP oci_upload_bytes_total uploaded bytes', '# TYPE oci_upload_bytes_total counter', f'oci_upload_bytes_total {sum( u[ "bytes" ] for u in self.uploads if u[ "ok" ] )}' ]
+         lines += [ '# HELP oci_upload_duration_seconds_total time spent uploading', '# TYPE oci_upload_duration_seconds_total counter', f'oci_upload_duration_seconds_total {sum( u[ "seconds" ] for u in self.uploads ):.6f}' ]
+
+      return '\n'.join( lines ) + '\n'
+
+##########################################################################
+# Region x compartment x AD fan-out
+###########################################################################
+def unit_key( region, compartment ):
+   return f'{region.region_name}/{compartment.id}'
+
+class FanOut(object):
+   max_workers = 8
+
+   def __init__(self, max_workers=None, rate_limits=None, endpoint=None, config=None):
+      if max_workers:
+         self.max_workers = max_workers
+
+      self.rate_limits = rate_limits or RateLimits()
+      self.endpoint = endpoint
+      self.config = config
+
+      # unit_key()s of compartments that are known to be unchanged and are not listed again
+      self.skip_units = set()
+
+      # with a Discovery, units are only listed for the resource types found in them
+      self.discovery = None
+
+      # with a Journal, units finished by an earlier attempt of the run are not listed again
+      self.journal = None
+
+   def client(self, client_class, signer, region_name):
+      return get_client( client_class, signer, region_name, self.endpoint, self.config )
+
+   def call(self, fn, *args, **kwargs):
+      return self.rate_limits.call( fn, *args, **kwargs )
+
+   def pages(self, fn, *args, **kwargs):
+      # follow opc-next-page until the last page, one rate limited call per page
+      while True:
+         response = self.call( fn, *args, **kwargs )
+
+         data = response.data
+         if not isinstance( data, list ):
+            # collections such as AnnouncementsCollection wrap the records in items
+            data = data.items
+
+         yield data
+
+         if not response.has_next_page:
+            return
+
+         kwargs[ 'page' ] = response.next_page
+
+   def paginate(self, fn, *args, **kwargs):
+      for page in self.pages( fn, *args, **kwargs ):
+         yield from page
+
+   def map(self, fn, units):
+      # results are returned in the order of units, not in the order the workers finish
+      with ThreadPoolExecutor( max_workers=self.max_workers ) as executor:
+         return list( executor.map( fn, units ) )
+
+   def stream(self, fn, units, queue_size=4):
+      # fn(unit) is a generator of pages - (unit, page) is yielded unit by unit in the order of units,
+      # while the following units are already being fetched, with at most queue_size pages held per unit
+      units = list( units )
+      queues = [ queue.Queue( queue_size ) for unit in units ]
+      cancelled = threading.Event()
+
+      def put( q, item ):
+         while not cancelled.is_set():
+            try:
+               q.put( item, timeout=0.1 )
+               return True
+            except queue.Full:
+               pass
+
+         return False
+
+      def run( unit, q ):
+         try:
+            for page in fn( unit ):
+               if not put( q, ( 'page', page ) ):
+                  return
+
+            put( q, ( 'done', None ) )
+         except Exception as e:
+            put( q, ( 'error', e ) )
+
+      executor = ThreadPoolExecutor( max_workers=self.max_workers )
+      try:
+         for unit, q in zip( units, queues ):
+            executor.submit( run, unit, q )
+
+         for unit, q in zip( units, queues ):
+            while True:
+               kind, item = q.get()
+               if kind == 'page':
+                  yield unit, item
+               elif kind == 'error':
+                  raise item
+               else:
+                  break
+      finally:
+         cancelled.set()
+         executor.shutdown( cancel_futures=True )
+
+   def region_units(self, tenancy):
+      return [ region for region in tenancy.regions ]
+
+   def compartment_units(self, tenancy, resource_types=None):
+      return [ (region, c) for region in tenancy.regions for c in tenancy.get_compartments() if unit_key( region, c ) not in self.skip_units and self.found( resource_types, region, c ) ]
+
+   def ad_units(self, tenancy, resource_types=None):
+      return [ (region, c, ad) for region, c in self.compartment_units(tenancy) for ad in tenancy.get_availability_domains(region.region_name) if self.found( resource_types, region, c, ad ) ]
+
+   def found(self, resource_types, region, c, ad=None):
+      if self.discovery is None or resource_types is None:
+         return True
+
+      return self.discovery.found( resource_types, region.region_name, c.id, ad.name if ad else None )
+
+##########################################################################
+# CSV and Parquet output
+###########################################################################
+# types of the Parquet columns by column name, so a column is typed the same in every table - string unless listed.
+# Categories are dictionary encoded
+column_types = {
+   'category': [ 'tenancy_id', 'compartment_id', 'region', 'region_name', 'availability_domain', 'fault_domain', 'shape', 'dedicated_vm_host_shape', 'lifecycle_state',
+                 'service_name', 'scope_type', 'attachment_type', 'database_edition', 'db_version', 'db_workload', 'license_model', 'announcement_type', 'role', 'peer_role',
+                 'protection_mode', 'transport_type', 'change', 'report_no' ],
+   'int': [ 'size_in_gbs', 'size_in_mbs', 'vpus_per_gb', 'cpu_core_count', 'node_count', 'data_storage_percentage', 'data_storage_size_in_gbs', 'reco_storage_size_in_gb',
+            'recovery_window_in_days', 'value', 'used', 'available' ],
+   'float': [ 'remaining_ocpus', 'total_ocpus', 'data_storage_size_in_tbs', 'database_size_in_gbs' ],
+   'bool': [ 'is_home_region', 'is_hydrated', 'is_pv_encryption_in_transit_enabled', 'is_read_only', 'is_shareable', 'auto_backup_enabled', 'sparse_diskgroup',
+             'is_auto_scaling_enabled', 'is_dedicated', 'is_free_tier' ],
+   'timestamp': [ 'time_updated', 'time_created', 'time_started', 'time_ended' ],
+}
+
+column_type = { name: kind for kind, names in column_types.items() for name in names }
+
+class Column(object):
+   def __init__(self, name, source):
+      # source is an attribute name, a function of the record, or None for a value of the collector context
+      self.name = name
+      self.source = source
+
+   def value(self, record, context):
+      if self.source is None:
+         return context[ self.name ]
+      if callable( self.source ):
+         return self.source( record )
+      if isinstance( record, dict ):
+         return record[ self.source ]
+      return getattr( record, self.source )
+
+class Schema(object):
+   def __init__(self, name, columns, key=None, types=None):
+      self.name = name
+      self.columns = [ Column( c, c ) if isinstance( c, str ) else Column( *c ) for c in columns ]
+      self.types = dict( column_type, **( types or {} ) )
+
+      # columns identifying a record between runs - the OCID, which comes first, unless told otherwise
+      self.key = key or [ self.columns[0].name ]
+
+      # compact, typed row the SDK models are reduced to as soon as they arrive
+      self.record_class = collections.namedtuple( ''.join( p.title() for p in name.split( '_' ) ) + 'Record', self.header() )
+
+   def header(self):
+      return [ c.name for c in self.columns ]
+
+   def record(self, record, context):
+      return self.record_class( *[ c.value( record, context ) for c in self.columns ] )
+
+   def key_of(self, row):
+      return '|'.join( str( getattr( row, name ) ) for name in self.key )
+
+   def type_of(self, name):
+      return self.types.get( name, 'string' )
+
+class CsvWriter(object):
+   # rows are streamed into a spooled temp file, which only goes to disk once it outgrows spool_size
+   extension = 'csv'
+   spool_size = 8 * 1024 * 1024
+
+   def __init__(self, schema, report_no, delta=False):
+      self.schema = schema
+      self.report_no = report_no
+      self.delta = delta
+      self.rows = 0
+
+      self.buffer = tempfile.SpooledTemporaryFile( max_size=self.spool_size )
+      self.text = io.TextIOWrapper( self.buffer, encoding='utf-8', newline='' )
+      self.writer = csv.writer( self.text )
+
+      # delta files carry the kind of change - added, changed or removed - before report_no
+      self.writer.writerow( schema.header() + ( [ 'change' ] if delta else [] ) + [ 'report_no' ] )
+
+   def write(self, row, change=None):
+      self.writer.writerow( list( row ) + ( [ change ] if self.delta else [] ) + [ self.report_no ] )
+      self.rows += 1
+
+   def writerows(self, rows):
+      for row in rows:
+         self.write( row )
+
+   def close(self):
+      # returns the encoded file rewound to the start, ready to upload
+      self.text.flush()
+      self.text.detach()
+      self.buffer.seek( 0 )
+      return self.buffer
+
+class ParquetWriter(object):
+   # the same columns as the CSV, typed - rows are gathered by column and written as compressed row groups
+   extension = 'parquet'
+   row_group_size = 64 * 1024
+   compression = 'zstd'
+
+   converters = {
+      'string': lambda v: None if v is None else str( v ),
+      'category': lambda v: None if v is None else str( v ),
+      'int': lambda v: None if v is None or v == '' else int( v ),
+      'float': lambda v: None if v is None or v == '' else float( v ),
+      'bool': lambda v: None if v is None or v == '' else bool( v ),
+      # rows of the snapshot come back with their timestamps as text
+      'timestamp': lambda v: datetime.datetime.fromisoformat( v ) if isinstance( v, str ) else v,
+   }
+
+   def __init__(self, schema, report_no, delta=False):
+      if pyarrow is None:
+         raise ImportError( 'the parquet output format needs pyarrow - pip install pyarrow' )
+
+      self.schema = schema
+      self.report_no = report_no
+      self.delta = delta
+      self.rows = 0
+
+      names = schema.header() + ( [ 'change' ] if delta else [] ) + [ 'report_no' ]
+      self.types = [ schema.type_of( name ) for name in names ]
+      self.arrow_schema = pyarrow.schema( [ pyarrow.field( name, self.arrow_type( kind ) ) for name, kind in zip( names, self.types ) ] )
+      self.columns = [ [] for name in names ]
+
+      self.sink = pyarrow.BufferOutputStream()
+      self.writer = pyarrow.parquet.ParquetWriter( self.sink, self.arrow_schema, compression=self.compression )
+
+   @staticmethod
+   def arrow_type( kind ):
+      return {
+         'string': pyarrow.string(),
+         'category': pyarrow.dictionary( pyarrow.int32(), pyarrow.string() ),
+         'int': pyarrow.int64(),
+         'float': pyarrow.float64(),
+         'bool': pyarrow.bool_(),
+         'timestamp': pyarrow.timestamp( 'us', tz='UTC' ),
+      }[ kind ]
+
+   def write(self, row, change=None):
+      values = list( row ) + ( [ change ] if self.delta else [] ) + [ self.report_no ]
+
+      for column, kind, value in zip( self.columns, self.types, values ):
+         column.append( self.converters[ kind ]( value ) )
+
+      self.rows += 1
+      if len( self.columns[0] ) >= self.row_group_size:
+         self.flush()
+
+   def writerows(self, rows):
+      for row in rows:
+         self.write( row )
+
+   def flush(self):
+      arrays = []
+      for column, kind, field in zip( self.columns, self.types, self.arrow_schema ):
+         if kind == 'category':
+            arrays.append( pyarrow.array( column, type=pyarrow.string() ).dictionary_encode() )
+         else:
+            arrays.append( pyarrow.array( column, type=field.type ) )
+
+      self.writer.write_table( pyarrow.Table.from_arrays( arrays, schema=self.arrow_schema ) )
+      self.columns = [ [] for column in self.columns ]
+
+   def close(self):
+      # an empty table still gets a file, with the schema of the table
+      if self.columns[0]:
+         self.flush()
+
+      self.writer.close()
+      return io.BytesIO( self.sink.getvalue().to_pybytes() )
+
+output_formats = { 'csv': CsvWriter, 'parquet': ParquetWriter }
+
+##########################################################################
+# Extract pipeline
+###########################################################################
+class Output(object):
+   # serializer stage - pages are written to the table's files, one per format, as soon as a collector
+   # publishes them, and the files are handed to the uploader once the collector is done.
+   # With a snapshot only the rows that were added, changed or removed since the last run are written
+   def __init__(self, uploader, report_no, snapshot=None, formats=None):
+      self.uploader = uploader
+      self.report_no = report_no
+      self.snapshot = snapshot
+      self.formats = formats or [ 'csv' ]
+      self.writers = {}
+
+   def new_writers(self, schema, delta=False):
+      return [ output_formats[ f ]( schema, self.report_no, delta=delta ) for f in self.formats ]
+
+   def writer(self, schema):
+      if schema.name not in self.writers:
+         self.writers[ schema.name ] = self.new_writers( schema, delta=self.snapshot is not None )
+
+      return self.writers[ schema.name ]
+
+   def write(self, schema, rows, unit=None):
+      writers = self.writer( schema )
+
+      if self.snapshot is None:
+         for writer in writers:
+            writer.writerows( rows )
+         return
+
+      for row in rows:
+         change = self.snapshot.diff( schema, row, unit )
+
+         if change:
+            for writer in writers:
+               writer.write( row, change )
+
+   def close(self, schema):
+      writers = self.writers.pop( schema.name, None ) or self.new_writers( schema, delta=self.snapshot is not None )
+
+      if self.snapshot is None:
+         for writer in writers:
+            self.upload( writer, schema.name )
+         return
+
+      removed = self.snapshot.removed( schema )
+      for writer in writers:
+         for row in removed:
+            writer.write( row, 'removed' )
+
+         self.upload( writer, f'{schema.name}_delta' )
+
+   def write_table(self, schema, rows):
+      # a whole table at once, always written in full
+      for writer in self.new_writers( schema ):
+         writer.writerows( rows )
+         self.upload( writer, schema.name )
+
+   def upload(self, writer, filename):
+      self.uploader.submit( writer.close(), f'{filename}_{self.report_no}.{writer.extension}' )
+
+class Collector(object):
+   # without an output the records are kept on the collector until records() or create_csv(output)
+   tables = {}
+   output = None
+
+   # tables that are only listed when they are among the details
+   optional_tables = set()
+   details = set()
+
+   def init_tables(self):
+      for table in self.tables:
+         setattr( self, table, [] )
+
+   def context(self):
+      return {}
+
+   def publish(self, table, records, unit=None):
+      schema = self.tables[ table ]
+      context = self.context()
+      rows = [ schema.record( record, context ) for record in records ]
+      self.publish_rows( table, rows, unit )
+
+      return rows
+
+   def publish_rows(self, table, rows, unit=None):
+      if self.output is None:
+         getattr( self, table ).extend( rows )
+      else:
+         self.output.write( self.tables[ table ], rows, unit )
+
+   def stream(self, fn, units, snapshot_unit=lambda unit: unit_key( unit[0], unit[1] )):
+      # fan_out.stream of fn over units, every page published as it comes - yields (unit, table, rows)
+      journal = self.fan_out.journal
+      if journal is None:
+         for unit, ( table, page ) in self.fan_out.stream( fn, units ):
+            yield unit, table, self.publish( table, page, snapshot_unit( unit ) )
+         return
+
+      name = self.journal_name( fn )
+      replayed, units = self.replay( journal, name, units, snapshot_unit )
+      yield from replayed
+
+      # a unit is journaled once the first page of the next one is in, or the stream ends
+      current, listed = None, {}
+      for unit, ( table, page ) in self.fan_out.stream( fn, units ):
+         if unit is not current:
+            if current is not None:
+               journal.record( name, journal_key( current ), listed )
+            current, listed = unit, {}
+
+         rows = self.publish( table, page, snapshot_unit( unit ) )
+         listed.setdefault( table, [] ).extend( rows )
+         yield unit, table, rows
+
+      if current is not None:
+         journal.record( name, journal_key( current ), listed )
+
+   def list_units(self, fn, units, **kwargs):
+      # stream() for listings that are only published
+      for unit, table, rows in self.stream( fn, units, **kwargs ):
+         pass
+
+   def journal_name(self, fn):
+      return f'{type( self ).__name__}.{fn.__name__}'
+
+   def replay(self, journal, name, units, snapshot_unit):
+      # publishes the rows of the units an earlier attempt of the run finished - returns their (unit, table, rows)
+      # and the units that are left
+      units = list( units )
+      finished = journal.finished( name )
+      replayed = []
+      left = []
+
+      for unit in units:
+         tables = finished.get( journal_key( unit ) )
+         if tables is None:
+            left.append( unit )
+            continue
+
+         for table, rows in tables.items():
+            rows = [ self.tables[ table ].record_class( *row ) for row in rows ]
+            self.publish_rows( table, rows, snapshot_unit( unit ) )
+            replayed.append( ( unit, table, rows ) )
+
+      if len( left ) < len( units ):
+         logger.info( f'{name} resumed - {len( units ) - len( left )} of {len( units )} units taken from the journal' )
+
+      return replayed, left
+
+   def listed_tables(self):
+      return { table: schema for table, schema in self.tables.items() if table not in self.optional_tables or table in self.details }
+
+   def records(self):
+      return { schema.name: getattr( self, table ) for table, schema in self.listed_tables().items() }
+
+   def create_csv(self, output=None):
+      if self.output is not None:
+         for schema in self.listed_tables().values():
+            self.output.close( schema )
+      else:
+         for name, rows in self.records().items():
+            output.write_table( self.schema( name ), rows )
+
+   def schema(self, name):
+      return next( schema for schema in self.tables.values() if schema.name == name )
+
+def db_backup_config( attribute, default=None ):
+   return lambda db: default if db.db_backup_config is None else getattr( db.db_backup_config, attribute )
+
+##########################################################################
+# Metadata cache
+###########################################################################
+class MetadataCache(object):
+   # slow-changing tenancy metadata kept on disk, each entity for its own time to live in seconds
+   ttls = {
+      'tenancy': 7 * 24 * 60 * 60,
+      'regions': 24 * 60 * 60,
+      'compartments': 60 * 60,
+      'availability_domains': 7 * 24 * 60 * 60,
+      'limit_services': 24 * 60 * 60,
+      'limit_values': 6 * 60 * 60,
+   }
+
+   def __init__(self, path='oci_metadata_cache', ttls=None):
+      self.ttls = dict( self.ttls, **( ttls or {} ) )
+      self.shelf = shelve.open( path )
+      self.lock = threading.Lock()
+
+   def get(self, tenancy_id, entity, key, fetch):
+      # returns the cached value while it is fresh, otherwise fetch() and cache the result
+      name = f'{tenancy_id}/{entity}/{key}'
+
+      with self.lock:
+         cached = self.shelf.get( name )
+
+      if cached and time.time() - cached[0] < self.ttls[ entity ]:
+         return cached[1]
+
+      value = fetch()
+
+      with self.lock:
+         self.shelf[ name ] = ( time.time(), value )
+
+      return value
+
+   def invalidate(self, tenancy_id=None, entity=None):
+      # drops everything cached for the tenancy and entity, or all of it when not given.
+      # Names are <tenancy>/<entity>/<key>, and neither OCIDs nor entities hold a /
+      with self.lock:
+         for name in list( self.shelf.keys() ):
+            cached_tenancy_id, cached_entity, key = name.split( '/', 2 )
+
+            if tenancy_id in ( None, cached_tenancy_id ) and entity in ( None, cached_entity ):
+               del self.shelf[ name ]
+
+   def close(self):
+      with self.lock:
+         self.shelf.close()
+
+class NoCache(object):
+   def get(self, tenancy_id, entity, key, fetch):
+      return fetch()
+
+   def invalidate(self, tenancy_id=None, entity=None):
+      pass
+
+   def close(self):
+      pass
+
+##########################################################################
+# Incremental extraction
+###########################################################################
+class SnapshotStore(object):
+   # the rows of the previous run, keyed by table and OCID, with the lifecycle state and a digest of the row.
+   # Nothing is committed unless the run uploaded every file, so a failed run is diffed again next time
+   full_refresh = 24 * 60 * 60
+
+   def __init__(self, report_no, path='oci_snapshot.db', full_refresh=None):
+      self.report_no = report_no
+      if full_refresh is not None:
+         self.full_refresh = full_refresh
+
+      self.db = sqlite3.connect( path )
+      self.db.execute( 'create table if not exists snapshot ( table_name text, key text, unit text, lifecycle_state text, digest text, row text, report_no text, primary key ( table_name, key ) )' )
+      self.db.execute( 'create table if not exists fingerprint ( unit text primary key, digest text, listed_at real )' )
+      self.db.commit()
+
+   def diff(self, schema, row, unit=None):
+      values = list( row )
+      key = schema.key_of( row )
+      digest = hashlib.sha1( json.dumps( values, default=str ).encode( 'utf-8' ) ).hexdigest()
+
+      previous = self.db.execute( 'select digest from snapshot where table_name = ? and key = ?', ( schema.name, key ) ).fetchone()
+      self.db.execute( 'insert or replace into snapshot values ( ?, ?, ?, ?, ?, ?, ? )',
+                       ( schema.name, key, unit, str( getattr( row, 'lifecycle_state', None ) ), digest, json.dumps( values, default=str ), self.report_no ) )
+
+      if previous is None:
+         return 'added'
+      if previous[0] != digest:
+         return 'changed'
+      return None
+
+   def removed(self, schema):
+      # rows of the last run that were not seen in this one
+      rows = self.db.execute( 'select row from snapshot where table_name = ? and report_no != ?', ( schema.name, self.report_no ) ).fetchall()
+      self.db.execute( 'delete from snapshot where table_name = ? and report_no != ?', ( schema.name, self.report_no ) )
+
+      return [ json.loads( row ) for ( row, ) in rows ]
+
+   def unchanged_units(self, fingerprints):
+      # units whose fingerprint matches the last full listing, as long as that listing is recent enough
+      now = time.time()
+      unchanged = set()
+
+      for unit, digest in fingerprints.items():
+         previous = self.db.execute( 'select digest, listed_at from fingerprint where unit = ?', ( unit, ) ).fetchone()
+
+         if previous and previous[0] == digest and now - previous[1] < self.full_refresh:
+            unchanged.add( unit )
+         else:
+            self.db.execute( 'insert or replace into fingerprint values ( ?, ?, ? )', ( unit, digest, now ) )
+
+      # rows of skipped units count as seen in this run
+      for unit in unchanged:
+         self.db.execute( 'update snapshot set report_no = ? where unit = ?', ( self.report_no, unit ) )
+
+      return unchanged
+
+   def commit(self):
+      self.db.commit()
+
+   def rollback(self):
+      self.db.rollback()
+
+   def close(self):
+      self.db.close()
+
+def compartment_fingerprints( fan_out, signer, tenancy ):
+   # one structured search per region - a digest of the resources of each compartment,
+   # their lifecycle states and creation times, to tell which compartments need to be listed again
+   resources = {}
+
+   for region in tenancy.regions:
+      search_client = fan_out.client( oci.resource_search.ResourceSearchClient, signer, region.region_name )
+      details = oci.resource_search.models.StructuredSearchDetails( query='query all resources', type='Structured', matching_context_type='NONE' )
+
+      for resource in fan_out.paginate( search_client.search_resources, details, limit=1000 ):
+         unit = f'{region.region_name}/{resource.compartment_id}'
+         resources.setdefault( unit, [] ).append( ( resource.identifier, resource.lifecycle_state, str( resource.time_created ) ) )
+
+   fingerprints = {}
+   for region, c in fan_out.compartment_units( tenancy ):
+      unit = unit_key( region, c )
+      fingerprints[ unit ] = hashlib.sha1( json.dumps( sorted( resources.get( unit, [] ) ) ).encode( 'utf-8' ) ).hexdigest()
+
+   return fingerprints
+
+##########################################################################
+# Checkpoints of a run
+###########################################################################
+class Journal(object):
+   # the rows of every unit a collector listed in full, by run - a run restarted with the same report_no
+   # publishes the units it finished from here and lists only the ones that are left.
+   # Opening a run drops what is left of the others, a run that uploaded every file drops its own
+   def __init__(self, report_no, path='oci_journal.db'):
+      self.report_no = report_no
+      self.db = sqlite3.connect( path )
+      self.db.execute( 'pragma journal_mode=wal' )
+      self.db.execute( 'pragma synchronous=normal' )
+      self.db.execute( 'create table if not exists unit ( report_no text, collector text, unit text, tables blob, primary key ( report_no, collector, unit ) )' )
+      self.db.execute( 'delete from unit where report_no != ?', ( report_no, ) )
+      self.db.commit()
+
+   def finished(self, collector):
+      # unit -> rows by table, as plain tuples
+      rows = self.db.execute( 'select unit, tables from unit where report_no = ? and collector = ?', ( self.report_no, collector ) ).fetchall()
+      return { unit: pickle.loads( tables ) for unit, tables in rows }
+
+   def record(self, collector, unit, tables):
+      # committed unit by unit, so a run that dies keeps every unit it finished
+      tables = { table: [ tuple( row ) for row in rows ] for table, rows in tables.items() }
+      self.db.execute( 'insert or replace into unit values ( ?, ?, ?, ? )', ( self.report_no, collector, unit, pickle.dumps( tables ) ) )
+      self.db.commit()
+
+   def clear(self):
+      self.db.execute( 'delete from unit where report_no = ?', ( self.report_no, ) )
+      self.db.commit()
+
+   def close(self):
+      self.db.close()
+
+def journal_key( unit ):
+   # the region name, then the OCIDs - or for limit services, the names - of the other parts of a fan-out unit
+   region, *parts = unit
+   return '/'.join( [ region.region_name ] + [ part if isinstance( part, str ) else getattr( part, 'id', None ) or part.name for part in parts ] )
+
+##########################################################################
+# Search-driven discovery
+###########################################################################
+class Discovery(object):
+   # one structured search per region tells which compartments and ADs hold each resource type,
+   # so the collectors only list there. Regions whose search fails are listed in full
+   resource_types = [ 'Instance', 'DedicatedVmHost', 'Volume', 'BootVolume', 'DbSystem', 'CloudVmCluster', 'VmCluster', 'AutonomousDatabase', 'AutonomousContainerDatabase',
+                      'AutonomousExadataInfrastructure' ]
+
+   def __init__(self, fan_out, signer, tenancy):
+      self.fan_out = fan_out
+      self.signer = signer
+
+      # (region, compartment) and (region, compartment, AD) -> resource types found there
+      self.compartments = {}
+      self.ads = {}
+      self.searched = set()
+
+      for region, resources in zip( tenancy.regions, fan_out.map( self.search, fan_out.region_units( tenancy ) ) ):
+         if resources is None:
+            continue
+
+         self.searched.add( region.region_name )
+
+         for resource in resources:
+            self.compartments.setdefault( ( region.region_name, resource.compartment_id ), set() ).add( resource.resource_type )
+
+            if resource.availability_domain:
+               self.ads.setdefault( ( region.region_name, resource.compartment_id, resource.availability_domain ), set() ).add( resource.resource_type )
+
+   def search(self, region):
+      search_client = self.fan_out.client( oci.resource_search.ResourceSearchClient, self.signer, region.region_name )
+      details = oci.resource_search.models.StructuredSearchDetails( query=f'query {", ".join( self.resource_types )} resources', type='Structured', matching_context_type='NONE' )
+
+      try:
+         return list( self.fan_out.paginate( search_client.search_resources, details, limit=1000 ) )
+      except oci.exceptions.ServiceError as e:
+         logger.warning( f'resource search failed in {region.region_name}, listing every compartment : {e.message}' )
+         return None
+
+   def found(self, resource_types, region_name, compartment_id, ad_name=None):
+      if region_name not in self.searched:
+         return True
+
+      if ad_name is None:
+         types = self.compartments.get( ( region_name, compartment_id ), set() )
+      else:
+         types = self.ads.get( ( region_name, compartment_id, ad_name ), set() )
+
+      return not types.isdisjoint( resource_types )
+
+def new_report_no( target=None ):
+   # runs of a batch start in the same second and may share a PAR - their report_no, and so their
+   # object names, carry the target as well
+   timetup = time.gmtime()
+   report_no = time.strftime('%Y-%m-%dT%H:%M:%SZ', timetup).replace( ':', '-')
+   if target:
+      report_no += '_' + re.sub( r'[^A-Za-z0-9_.-]', '-', target )
+
+   return report_no
+
+DEFAULT_CONFIG_FILE = "/.oci/config"
+
+# the snapshot, metadata cache and journal files live here rather than in the working directory
+DEFAULT_STATE_DIR = os.environ.get( 'OCI_STATE_DIR' ) or os.path.join( os.path.expanduser( '~' ), '.oci_python' )
+
 class OCIService(object):
-   def __init__(self, authentication):
-      global report_no
-      global par_url
-      
-      self.config = oci.config.from_file( "/.oci/config", "DEFAULT")
-      par_url = self.config[ 'par' ]   
+   # all state lives on the instance, so one process can extract any number of tenancies back to back.
+   # incremental writes the rows added, changed and removed since the last run, every compartment is still listed.
+   # skip_unchanged also skips the compartments whose resources kept their OCIDs, lifecycle states and creation
+   # times - a rename, resize or reshape there goes unseen until the compartment is listed in full again,
+   # at most full_refresh seconds (SnapshotStore.full_refresh by default) after it last was.
+   # snapshot_path, metadata_cache_path and journal_path are relative to state_dir, None turns the cache or the journal off.
+   # The journal is off by default - given a journal_path, a failed run resumed with its report_no skips what it finished
+   def __init__(self, authentication, max_workers=None, initial_rate=None, incremental=False, snapshot_path='oci_snapshot.db', metadata_cache_path='oci_metadata_cache', refresh_metadata=False,
+                skip_limit_services=None, skip_limits=None, excluded_compartments=None, config_file=DEFAULT_CONFIG_FILE, profile="DEFAULT",
+                async_mode=False, max_in_flight=None, prometheus_path=None, service_endpoint=None, output_formats=None, discovery=False, db_details=None,
+                journal_path=None, skip_unchanged=False, full_refresh=None, state_dir=DEFAULT_STATE_DIR):
+      self.config = oci.config.from_file( config_file, profile)
+      self.par_url = self.config[ 'par' ]   
+      self.fan_out = FanOut( max_workers, RateLimits( initial_rate ), service_endpoint )
+      self.incremental = incremental
+      self.skip_unchanged = skip_unchanged
+      self.full_refresh = full_refresh
+      self.state_dir = state_dir
+      self.snapshot_path = snapshot_path
+      self.metadata_cache_path = metadata_cache_path
+      self.refresh_metadata = refresh_metadata
+      self.skip_limit_services = skip_limit_services
+      self.skip_limits = skip_limits
+      self.excluded_compartments = excluded_compartments
+      self.async_mode = async_mode
+      self.max_in_flight = max_in_flight
+      self.prometheus_path = prometheus_path
+      self.output_formats = output_formats
+      self.discovery = discovery
+      self.db_details = db_details
+      self.journal_path = journal_path
 
       # if intance pricipals - generate signer from token or config
       if( authentication == 'CONFIG' ):
          self.generate_signer_from_config()
       else:
          self.generate_signer_from_instance_principals()
-      
-      timetup = time.gmtime()
-      report_no = time.strftime('%Y-%m-%dT%H:%M:%SZ', timetup).replace( ':', '-')
-
-   def extract_data(self):
-      tenancy = Tenancy(self.config, self.signer)
-      announcement = Announcement(self.config, self.signer)
-      limit = Limit( self.config, tenancy, self.signer )
-      compute = Compute( self.config, tenancy, self.signer)
-      block_storage = BlockStorage(self.config, tenancy, self.signer)    
-      db_system = DBSystem( self.config, tenancy, self.signer )
-
-      tenancy.create_csv()
-      announcement.create_csv()
-      limit.create_csv()
-      compute.create_csv()
-      block_storage.create_csv()
-      db_system.create_csv()
+
+      # instance principals replace the config
+      self.fan_out.config = self.config
+      self.report_no = new_report_no()
+
+   def state_file(self, path):
+      if not path:
+         return None
+
+      os.makedirs( self.state_dir, exist_ok=True )
+      return os.path.join( self.state_dir, path )
+
+   def open_cache(self):
+      cache = MetadataCache( self.state_file( self.metadata_cache_path ) ) if self.metadata_cache_path else NoCache()
+      if self.refresh_metadata:
+         cache.invalidate( self.config[ 'tenancy' ] )
+
+      return cache
+
+   def collect(self):
+      # in-process API - runs every collector and returns their records by table name, nothing is uploaded
+      self.fan_out.skip_units = set()
+      self.fan_out.discovery = None
+      self.fan_out.journal = None
+      cache = self.open_cache()
+
+      try:
+         tenancy = Tenancy(self.config, self.signer, self.fan_out, cache, self.excluded_compartments)
+         if self.discovery:
+            self.fan_out.discovery = Discovery( self.fan_out, self.signer, tenancy )
+
+         records = tenancy.records()
+         records.update( Announcement(self.config, self.signer, self.fan_out).records() )
+         records.update( Limit( self.config, tenancy, self.signer, self.fan_out, None, cache, self.skip_limit_services, self.skip_limits ).records() )
+         for collector in self.list_resources( tenancy ):
+            records.update( collector.records() )
+      finally:
+         cache.close()
+
+      return records
+
+   def extract_data(self, report_no=None):
+      # every collector streams its records into the output while it runs, and its files
+      # are uploaded in the background while the next collector is collecting.
+      # Given the report_no of a run that failed, only what that run did not finish is listed
+      self.report_no = report_no or new_report_no()
+      self.fan_out.skip_units = set()
+      self.fan_out.discovery = None
+      self.fan_out.journal = journal = Journal( self.report_no, self.state_file( self.journal_path ) ) if self.journal_path else None
+      self.profiler = profiler = self.fan_out.rate_limits.profiler = Profiler()
+
+      uploader = Uploader( self.par_url, profiler=profiler )
+      snapshot = SnapshotStore( self.report_no, self.state_file( self.snapshot_path ), self.full_refresh ) if self.incremental else None
+      output = Output( uploader, self.report_no, snapshot, self.output_formats )
+      cache = self.open_cache()
+
+      try:
+         with profiler.phase( 'Tenancy' ):
+            tenancy = Tenancy(self.config, self.signer, self.fan_out, cache, self.excluded_compartments)
+            tenancy.create_csv( output )
+
+         if snapshot and self.skip_unchanged:
+            with profiler.phase( 'fingerprints' ):
+               self.fan_out.skip_units = snapshot.unchanged_units( compartment_fingerprints( self.fan_out, self.signer, tenancy ) )
+            logger.info( f'incremental run - {len( self.fan_out.skip_units )} unchanged compartments skipped' )
+
+         if self.discovery:
+            with profiler.phase( 'discovery' ):
+               self.fan_out.discovery = Discovery( self.fan_out, self.signer, tenancy )
+
+         with profiler.phase( 'Announcement' ):
+            Announcement(self.config, self.signer, self.fan_out, output).create_csv()
+
+         with profiler.phase( 'Limit' ):
+            Limit( self.config, tenancy, self.signer, self.fan_out, output, cache, self.skip_limit_services, self.skip_limits ).create_csv()
+
+         self.list_resources( tenancy, output )
+      except Exception:
+         logger.exception( f'run {self.report_no} failed' )
+         if journal:
+            logger.error( f'extract_data( report_no="{self.report_no}" ) resumes run {self.report_no}' )
+            journal.close()
+         raise
+      finally:
+         cache.close()
+         failed = uploader.wait()
+
+         # the run profile goes next to the CSVs, once their uploads are timed
+         report = json.dumps( profiler.report(), indent=1 ).encode( 'utf-8' )
+         uploader.submit( io.BytesIO( report ), f'run_profile_{self.report_no}.json' )
+         failed += uploader.wait()
+         uploader.close()
+
+      if self.prometheus_path:
+         with open( self.prometheus_path, 'w' ) as f:
+            f.write( profiler.prometheus() )
+
+      for object_name in failed:
+         logger.error( f'{object_name} was not uploaded' )
+
+      if snapshot:
+         if failed:
+            snapshot.rollback()
+         else:
+            snapshot.commit()
+
+         snapshot.close()
+
+      if journal:
+         if failed:
+            logger.error( f'extract_data( report_no="{self.report_no}" ) resumes run {self.report_no}' )
+         else:
+            journal.clear()
+
+         journal.close()
+
+      for ( region_name, service ), rate in sorted( self.fan_out.rate_limits.rates().items() ):
+         logger.info( f'{service} {region_name} settled at {rate:.2f} requests/s' )
+
       print( f'File extraction completed')
+      return failed
+
+   def list_resources(self, tenancy, output=None):
+      # the region x compartment x AD listings, on worker threads or on one event loop
+      if self.async_mode:
+         # imported here, oci_async builds on this module and aiohttp is optional
+         import oci_async
+         return oci_async.collect( tenancy, self.signer, self.fan_out, output, self.max_in_flight, self.db_details )
+
+      collectors = []
+      for collector_class, kwargs in [ ( Compute, {} ), ( BlockStorage, {} ), ( DBSystem, { 'details': self.db_details } ) ]:
+         with self.fan_out.rate_limits.profiler.phase( collector_class.__name__ ):
+            collector = collector_class( self.config, tenancy, self.signer, self.fan_out, output, **kwargs )
+            if output is not None:
+               collector.create_csv()
+
+         collectors.append( collector )
+
+      return collectors
 
    ##########################################################################
    # Generate Signer from config
@@ -100,383 +1431,483 @@ class OCIService(object):
       # generate config info from signer
       self.config = {'region': self.signer.region, 'tenancy': self.signer.tenancy_id}
 
-class Tenancy(object):
-   tenancy_id = None
-   name = None
-   description = None
-   home_region = None
+##########################################################################
+# Batch extraction of many tenancies
+###########################################################################
+def extract_target( target ):
+   # runs in a pool process - one tenancy, with caches of its own so that processes never share a file.
+   # target is a dict of profile, authentication ('CONFIG' or 'INSTANCE') and optionally config_file, max_workers, incremental,
+   # skip_unchanged, journal, state_dir and the report_no of a failed run to resume
+   authentication = target.get( 'authentication', 'CONFIG' )
+   name = target[ 'profile' ] if authentication == 'CONFIG' else f'instance_{target[ "profile" ]}'
 
-   compartments = []
-   regions = None
-   availability_domains = []
-   limit_summary = []
+   summary = { 'target': name, 'tenancy': None, 'report_no': None, 'failed_uploads': [], 'error': None }
+   started = time.time()
 
-   def __init__(self, config, signer):
+   try:
+      service = OCIService( authentication, max_workers=target.get( 'max_workers' ), incremental=target.get( 'incremental', False ),
+                            skip_unchanged=target.get( 'skip_unchanged', False ),
+                            snapshot_path=f'oci_snapshot_{name}.db', metadata_cache_path=f'oci_metadata_cache_{name}',
+                            journal_path=f'oci_journal_{name}.db' if target.get( 'journal' ) else None, state_dir=target.get( 'state_dir' ) or DEFAULT_STATE_DIR,
+                            config_file=target.get( 'config_file', DEFAULT_CONFIG_FILE ), profile=target[ 'profile' ] )
+
+      # known before the run starts, so that a failed run can be resumed under the same object names
+      summary[ 'tenancy' ] = service.config[ 'tenancy' ]
+      summary[ 'report_no' ] = report_no = target.get( 'report_no' ) or new_report_no( name )
+      summary[ 'failed_uploads' ] = service.extract_data( report_no )
+   except ( Exception, SystemExit ) as e:
+      logger.exception( f'extraction of {name} failed' )
+      summary[ 'error' ] = str( e ) or type( e ).__name__
+
+   summary[ 'seconds' ] = round( time.time() - started, 1 )
+   return summary
+
+def extract_tenancies( targets, processes=None ):
+   # every pool process imports the SDK once and then extracts one tenancy after the other
+   with ProcessPoolExecutor( max_workers=processes ) as executor:
+      summaries = list( executor.map( extract_target, targets ) )
+
+   failed = [ s[ 'target' ] for s in summaries if s[ 'error' ] or s[ 'failed_uploads' ] ]
+   if failed:
+      logger.error( f'{len( failed )} of {len( summaries )} tenancies failed : {", ".join( failed )}' )
+
+   return summaries
+
+class Tenancy(Collector):
+   tables = {
+      'tenancy': Schema( 'tenancy', [ 'tenancy_id', ( 'tenancy_name', 'name' ), 'description', 'home_region' ] ),
+      'regions': Schema( 'region', [ ( 'tenancy_id', None ), 'region_key', 'region_name', 'is_home_region' ] ),
+      'compartments': Schema( 'compartment', [ ( 'compartment_id', 'id' ), 'name', 'description', ( 'tenancy_id', 'compartment_id' ) ] ),
+      'availability_domains': Schema( 'availability_domain', [ ( 'ad_id', 'id' ), ( 'ad_name', 'name' ), ( 'tenancy_id', 'compartment_id' ), 'region_name' ] ),
+   }
+
+   excluded_compartments = { 'ManagedCompartmentForPaaS', 'OCI_Scripts' }
+
+   def __init__(self, config, signer, fan_out=None, cache=None, excluded_compartments=None):
       self.tenancy_id = config["tenancy"]
+      self.compartments = []
+      self.availability_domains = []
+      self.signer = signer
+      self.fan_out = fan_out = fan_out or FanOut( config=config )
+      self.cache = cache = cache or NoCache()
 
-      identity_client = oci.identity.IdentityClient(config = {}, signer=signer )
-      tenancy = identity_client.get_tenancy( self.tenancy_id ).data
+      identity_client = fan_out.client( oci.identity.IdentityClient, signer, config["region"] )
+      tenancy = cache.get( self.tenancy_id, 'tenancy', '', lambda: fan_out.call( identity_client.get_tenancy, self.tenancy_id ).data )
 
       self.name = tenancy.name
       self.description = tenancy.description
       self.home_region = tenancy.home_region_key
 
-      self.regions = identity_client.list_region_subscriptions( self.tenancy_id ).data
+      self.regions = cache.get( self.tenancy_id, 'regions', '', lambda: fan_out.call( identity_client.list_region_subscriptions, self.tenancy_id ).data )
 
       self.compartments.append( oci.identity.models.Compartment(compartment_id=tenancy.id, name=f'{tenancy.name} (root)', description=tenancy.description, id=tenancy.id) )
-      self.compartments += identity_client.list_compartments( self.tenancy_id, compartment_id_in_subtree=True, access_level="ACCESSIBLE" ).data
-
-      for region in self.regions:
-         signer.region = region.region_name
-         identity_client = oci.identity.IdentityClient(config = {}, signer=signer)
-
-         self.availability_domains += identity_client.list_availability_domains(self.tenancy_id).data
-
-   def get_compartments(self):
-      return [c for c in self.compartments if ( c.lifecycle_state == 'ACTIVE' and c.name != 'ManagedCompartmentForPaaS' and c.name != 'OCI_Scripts' )]
-
-   def get_availability_domains( self, region_name):
-      #return [e for e in availability.domains if e.region_name == region_name]
-      data = []
-      for ad in self.availability_domains:
-         s = ad.name.split( '-')
-         name = f'{s[0][5:].lower()}-{s[1].lower()}-{s[2].lower()}'
-         if name == region_name.lower():
-            data.append( ad )
-
-      return data
-
-   def create_csv(self):
-      data = 'tenancy_id, tenancy_name, description, home_region, report_no'
-      data += '\n'
-      data += f'{self.tenancy_id}, {self.name}, {self.description}, {self.home_region}, {report_no}'
-
-      write_file( data, 'tenancy' )
-
-      # Region
-      data = 'tenancy_id, region_key, region_name, is_home_region, report_no'
-      
-      for region in self.regions:
-         data += '\n'
-         data += f'{self.tenancy_id}, {region.region_key}, {region.region_name}, {region.is_home_region}, {report_no}'
-      
-      write_file( data, 'region' )
-
-      # Compartment
-      data = 'compartment_id, name, description, tenancy_id, report_no'      
-
-      for compartment in self.compartments:
-         data += '\n'
-         data += f'{compartment.id}, {compartment.name}, {compartment.description}, {compartment.compartment_id}, {report_no}'
+      self.compartments += cache.get( self.tenancy_id, 'compartments', '', lambda: list( fan_out.paginate( identity_client.list_compartments, self.tenancy_id, compartment_id_in_subtree=True, access_level="ACCESSIBLE" ) ) )
 
-      write_file( data, 'compartment' )
+      if excluded_compartments is not None:
+         self.excluded_compartments = set( excluded_compartments )
 
-      # Availability Domains
-      data = 'ad_id, ad_name, tenancy_id, region_name, report_no'
-      for ad in self.availability_domains:
-         s = ad.name.split( '-')
-         data += '\n'
-         data += f'{ad.id}, {ad.name}, {ad.compartment_id}, {s[0][5:].lower()}-{s[1].lower()}-{s[2].lower()}, {report_no}'
+      # built once here - the fan-out asks for these for every region and compartment
+      self.active_compartments = [ c for c in self.compartments if c.lifecycle_state == 'ACTIVE' and c.name not in self.excluded_compartments ]
 
-      write_file( data, 'availability_domain' )
+      # ADs are indexed by the region they were listed in, rather than parsed out of their names,
+      # which are shaped differently across regions and realms
+      self.region_ads = {}
+      self.ad_regions = {}
 
-class Announcement(object):
-   annoucements = []
+      for region, ads in zip( self.regions, fan_out.map( self.list_availability_domains, fan_out.region_units(self) ) ):
+         self.availability_domains += ads
+         self.region_ads[ region.region_name.lower() ] = ads
 
-   def __init__(self, config, signer):
-      announcement_service = oci.announcements_service.AnnouncementClient( config={}, signer=signer )
-      self.announcements = announcement_service.list_announcements( config[ "tenancy" ], lifecycle_state=oci.announcements_service.models.AnnouncementSummary.LIFECYCLE_STATE_ACTIVE, sort_by="timeCreated" ).data
+         for ad in ads:
+            self.ad_regions[ ad.name ] = region.region_name
 
-   def create_csv(self):
-      data = 'affected_regions, announcement_type, announcement_id, reference_ticket_number, services, summary, time_updated, type, report_no'
+   def list_availability_domains(self, region):
+      identity_client = self.fan_out.client( oci.identity.IdentityClient, self.signer, region.region_name )
+      return self.cache.get( self.tenancy_id, 'availability_domains', region.region_name, lambda: self.fan_out.call( identity_client.list_availability_domains, self.tenancy_id).data )
 
-      for announcement in self.announcements.items:
-         affected_regions = str(announcement.affected_regions).strip( '[]' ).replace( ',', '/' ).replace( "'",'' )
-         services = str(announcement.services).strip( '[]' ).replace( ',', '/' ).replace( "'",'' )
-         data += '\n'
-         data += f'{affected_regions}, {announcement.announcement_type}, {announcement.id}, {announcement.reference_ticket_number}, {services}, {announcement.summary}, {announcement.time_updated}, {announcement.type}, {report_no}'
-      
-      write_file( data, 'announcement' )
-
-class Limit(object):
-
-   limit_summary = []
-
-   def __init__(self, config, tenancy, signer):
-      tenancy_id = config[ "tenancy" ]
+   def get_compartments(self):
+      return self.active_compartments
 
+   def get_availability_domains( self, region_name):
+      return self.region_ads.get( region_name.lower(), [] )
+
+   def context(self):
+      return { 'tenancy_id': self.tenancy_id }
+
+   def records(self):
+      # the tenancy keeps the SDK models, the other collectors work from them
+      context = self.context()
+      ads = [ { 'id': ad.id, 'name': ad.name, 'compartment_id': ad.compartment_id, 'region_name': self.ad_regions[ ad.name ] } for ad in self.availability_domains ]
+
+      sources = { 'tenancy': [ self ], 'regions': self.regions, 'compartments': self.compartments, 'availability_domains': ads }
+      return { schema.name: [ schema.record( record, context ) for record in sources[ table ] ] for table, schema in self.tables.items() }
+
+class Announcement(Collector):
+   tables = {
+      'announcements': Schema( 'announcement', [ ( 'affected_regions', lambda a: '/'.join( a.affected_regions or [] ) ), 'announcement_type', ( 'announcement_id', 'id' ), 'reference_ticket_number',
+                                                 ( 'services', lambda a: '/'.join( a.services or [] ) ), 'summary', 'time_updated', 'type' ], key=[ 'announcement_id' ] ),
+   }
+
+   def __init__(self, config, signer, fan_out=None, output=None):
+      self.init_tables()
+      self.output = output
+      fan_out = fan_out or FanOut( config=config )
+      announcement_service = fan_out.client( oci.announcements_service.AnnouncementClient, signer, config["region"] )
+
+      for page in fan_out.pages( announcement_service.list_announcements, config[ "tenancy" ], lifecycle_state=oci.announcements_service.models.AnnouncementSummary.LIFECYCLE_STATE_ACTIVE, sort_by="timeCreated" ):
+         self.publish( 'announcements', page )
+
+class Limit(Collector):
+   tables = {
+      'limit_summary': Schema( 'limit', [ 'region_name', 'service_name', 'service_description', 'limit_name', 'availability_domain', 'scope_type', 'value', 'used', 'available' ],
+                               key=[ 'region_name', 'service_name', 'limit_name', 'availability_domain' ] ),
+   }
+
+   # services, and limits as 'service/limit', that are not worth collecting
+   skip_services = set()
+   skip_limits = set()
+
+   def __init__(self, config, tenancy, signer, fan_out=None, output=None, cache=None, skip_services=None, skip_limits=None):
+      self.tenancy_id = tenancy_id = config[ "tenancy" ]
+      self.signer = signer
+      self.init_tables()
+      self.output = output
+      self.fan_out = fan_out = fan_out or FanOut( config=config )
+      self.cache = cache = cache or NoCache()
+
+      if skip_services is not None:
+         self.skip_services = set( skip_services )
+      if skip_limits is not None:
+         self.skip_limits = set( skip_limits )
+
+      units = []
       for region in tenancy.regions:
-         signer.region = region.region_name
-         
-         limits_client = oci.limits.LimitsClient(config={}, signer=signer)
+         limits_client = fan_out.client( oci.limits.LimitsClient, signer, region.region_name )
          
-         services = limits_client.list_services( tenancy_id, sort_by="name").data
-
-         if services:
-            # oci.limits.models.ServiceSummary
-            for service in services:            
-               # get the limits per service
-               
-               limits = limits_client.list_limit_values(tenancy_id, service_name=service.name, sort_by="name").data
-
-               for limit in limits:
-                  val = {
-                           'service_name': str(service.name),
-                           'service_description': str(service.description),
-                           'limit_name': str(limit.name),
-                           'availability_domain': ("" if limit.availability_domain is None else str(limit.availability_domain)),
-                           'scope_type': str(limit.scope_type),
-                           'value': str(limit.value),
-                           'used': "",
-                           'available': "",
-                           'region_name': str(signer.region)
-                  }
-
-                  # if not limit, continue, don't calculate limit = 0
-                  if limit.value == 0:
-                     continue
-
-                  # get usage per limit if available
-                  usage = []
-                  
-                  if limit.scope_type == "AD":
-                     usage = limits_client.get_resource_availability(service.name, limit.name, tenancy_id, availability_domain=limit.availability_domain).data
-                  else:
-                     usage = limits_client.get_resource_availability(service.name, limit.name, tenancy_id).data
-
-                  # oci.limits.models.ResourceAvailability
-                  if usage.used:
-                     val['used'] = str(usage.used)
-                     
-                  if usage.available:
-                     val['available'] = str(usage.available)
-
-                  self.limit_summary.append(val)
-
-   def create_csv(self):
-      data = 'region_name, service_name, service_description, limit_name, availability_domain, scope_type, value, used, available, report_no'
-      for limit in self.limit_summary:
-         data += '\n'
-         data += f"{limit['region_name']}, {limit['service_name']}, {limit['service_description']}, {limit['limit_name']}, {limit['availability_domain']}, {limit['scope_type']}, {limit['value']}, {limit[ 'used' ]}, {limit[ 'available' ]}, {report_no}"
-
-      write_file( data, 'limit' )
-
-class Compute(object):
-   dedicated_hosts = []
-   instances = []
-   bv_attachments = []
-   vol_attachments = []
-   tenancy_id = None
-
-   def __init__(self, config, tenancy, signer):
-      self.tenancy_id = config[ 'tenancy']
-
-      for region in tenancy.regions:
-         signer.region = region.region_name
-
-         compute_client = oci.core.ComputeClient(config={}, signer=signer)
-
-         cnt = 0
-
-         for c in tenancy.get_compartments():
-            self.dedicated_hosts += compute_client.list_dedicated_vm_hosts(c.id).data
-            self.instances += compute_client.list_instances(c.id).data
-            self.vol_attachments += compute_client.list_volume_attachments(c.id).data
+         services = cache.get( tenancy_id, 'limit_services', region.region_name, lambda: list( fan_out.paginate( limits_client.list_services, tenancy_id, sort_by="name") ) )
+
+         # oci.limits.models.ServiceSummary
+         units += [ ( region, service ) for service in services if service.name not in self.skip_services ]
+
+      # every (region, service) is collected by its own worker, the rate limiter keeps each region in check
+      self.list_units( self.list_service, units, snapshot_unit=lambda unit: None )
+
+   def list_service(self, unit):
+      region, service = unit
+      tenancy_id = self.tenancy_id
+      limits_client = self.fan_out.client( oci.limits.LimitsClient, self.signer, region.region_name )
+
+      # limit values hardly ever change, only the usage is fetched on every run
+      limits = self.cache.get( tenancy_id, 'limit_values', f'{region.region_name}/{service.name}', lambda: list( self.fan_out.paginate( limits_client.list_limit_values, tenancy_id, service_name=service.name, sort_by="name") ) )
+
+      summary = []
+      for limit in limits:
+         val = {
+                  'service_name': str(service.name),
+                  'service_description': str(service.description),
+                  'limit_name': str(limit.name),
+                  'availability_domain': ("" if limit.availability_domain is None else str(limit.availability_domain)),
+                  'scope_type': str(limit.scope_type),
+                  'value': str(limit.value),
+                  'used': "",
+                  'available': "",
+                  'region_name': str(region.region_name)
+         }
+
+         # if not limit, continue, don't calculate limit = 0
+         if limit.value == 0 or f'{service.name}/{limit.name}' in self.skip_limits:
+            continue
+
+         # get usage per limit if available
+         if limit.scope_type == "AD":
+            usage = self.fan_out.call( limits_client.get_resource_availability, service.name, limit.name, tenancy_id, availability_domain=limit.availability_domain).data
+         else:
+            usage = self.fan_out.call( limits_client.get_resource_availability, service.name, limit.name, tenancy_id).data
+
+         # oci.limits.models.ResourceAvailability
+         if usage.used:
+            val['used'] = str(usage.used)
             
-            ads = tenancy.get_availability_domains(region.region_name)
-
-            for ad in ads:
-               self.bv_attachments += compute_client.list_boot_volume_attachments( ad.name, c.id ).data
-
-               cnt += 1
-               # sleep 0.5 seconds every 10 checks to avoid too many requests
-               if cnt % 5 == 0:
-                  time.sleep(0.5)
-               
-   def create_csv(self):
-      # Dedicated VM Hosts
-      data = 'id, availability_domain, compartment_id, dedicated_vm_host_shape, display_name, fault_domain, lifecycle_state, remaining_ocpus, total_ocpus, report_no'
-
-      for host in self.dedicated_hosts:
-         data += '\n'
-         data += f'{host.id}, {host.availability_domain}, {host.compartment_id}, {host.dedicated_vm_host_shape}, {host.display_name}, {host.fault_domain}, {host.lifecycle_state}, {host.remaining_ocpus}, {host.total_ocpus}, {report_no}'
+         if usage.available:
+            val['available'] = str(usage.available)
 
-      write_file( data, 'dedicated_vm_host' )
+         summary.append( val )
 
-      # VM Instances
-      data = 'instance_id, availability_domain, compartment_id, dedicated_vm_host_id, display_name, fault_domain, lifecycle_state, region, shape, tenancy_id, report_no'
+      yield 'limit_summary', summary
 
-      for instance in self.instances:
-         data += '\n'
-         data += f'{instance.id}, {instance.availability_domain}, {instance.compartment_id}, {instance.dedicated_vm_host_id}, {instance.display_name}, {instance.fault_domain}, {instance.lifecycle_state}, {instance.region}, {instance.shape}, {self.tenancy_id}, {report_no}'
+class Compute(Collector):
+   tables = {
+      'dedicated_hosts': Schema( 'dedicated_vm_host', [ 'id', 'availability_domain', 'compartment_id', 'dedicated_vm_host_shape', 'display_name', 'fault_domain', 'lifecycle_state', 'remaining_ocpus', 'total_ocpus' ] ),
+      'instances': Schema( 'instance', [ ( 'instance_id', 'id' ), 'availability_domain', 'compartment_id', 'dedicated_vm_host_id', 'display_name', 'fault_domain', 'lifecycle_state', 'region', 'shape', ( 'tenancy_id', None ) ] ),
+      'bv_attachments': Schema( 'bv_attachment', [ 'id', 'availability_domain', 'boot_volume_id', 'compartment_id', 'display_name', 'instance_id', 'is_pv_encryption_in_transit_enabled', 'lifecycle_state' ] ),
+      'vol_attachments': Schema( 'vol_attachment', [ 'id', 'attachment_type', 'availability_domain', 'compartment_id', 'device', 'display_name', 'instance_id', 'is_pv_encryption_in_transit_enabled', 'is_read_only', 'is_shareable', 'lifecycle_state', 'volume_id' ] ),
+   }
 
-      write_file( data, 'instance' )
-
-      # Boot Volume Attachments
-      data = 'id, availability_domain, boot_volume_id, compartment_id, display_name, instance_id, is_pv_encryption_in_transit_enabled, lifecycle_state, report_no'
-
-      for bv in self.bv_attachments:
-         data += '\n'
-         data += f'{bv.id}, {bv.availability_domain}, {bv.boot_volume_id}, {bv.compartment_id}, {bv.display_name}, {bv.instance_id}, {bv.is_pv_encryption_in_transit_enabled}, {bv.lifecycle_state}, {report_no}'
-
-      write_file( data, 'bv_attachment' )
-
-      # Block Volume Attachments
-      data = 'id, attachment_type, availability_domain, compartment_id, device, display_name, instance_id, is_pv_encryption_in_transit_enabled, is_read_only, is_shareable, lifecycle_state, volume_id, report_no'
-      for vol in self.vol_attachments:
-         data += '\n'
-         data += f'{vol.id}, {vol.attachment_type}, {vol.availability_domain}, {vol.compartment_id}, {vol.device}, {vol.display_name}, {vol.instance_id}, {vol.is_pv_encryption_in_transit_enabled}, {vol.is_read_only}, {vol.is_shareable}, {vol.lifecycle_state}, {vol.volume_id}, {report_no}'
-         write_file( data, 'vol_attachment' )
+   tenancy_id = None
 
-class BlockStorage(object):
-   boot_volumes = []
-   block_volumes = []
+   # resource types whose presence, with discovery, decides which units are listed - attachments go with the instances
+   compartment_resources = [ 'Instance', 'DedicatedVmHost' ]
+   ad_resources = [ 'Instance' ]
 
-   def __init__(self, config, tenancy, signer):
+   def __init__(self, config, tenancy, signer, fan_out=None, output=None):
+      self.tenancy_id = config[ 'tenancy']
+      self.signer = signer
+      self.init_tables()
+      self.output = output
+      self.fan_out = fan_out = fan_out or FanOut( config=config )
 
-      for region in tenancy.regions:
-         signer.region = region.region_name
-         
-         block_storage_client = oci.core.BlockstorageClient(config={}, signer=signer)
+      self.list_units( self.list_compartment, fan_out.compartment_units(tenancy, self.compartment_resources) )
 
-         cnt = 0
-         
-         for c in tenancy.get_compartments():                   
-            ads = tenancy.get_availability_domains(region.region_name)
-            self.block_volumes += block_storage_client.list_volumes(c.id).data
+      self.list_units( self.list_ad, fan_out.ad_units(tenancy, self.ad_resources) )
 
-            for ad in ads:            
-               self.boot_volumes += block_storage_client.list_boot_volumes(ad.name, c.id).data
+   def list_compartment(self, unit):
+      region, c = unit
+      compute_client = self.fan_out.client( oci.core.ComputeClient, self.signer, region.region_name )
 
-               cnt += 1
-               # sleep 0.5 seconds every 10 checks to avoid too many requests
-               if cnt % 2 == 0:
-                  time.sleep(0.5)
+      for page in self.fan_out.pages( compute_client.list_dedicated_vm_hosts, c.id):
+         yield 'dedicated_hosts', page
 
-   def create_csv(self):
-      # Boot Volumes
-      data = 'id, availability_domain, compartment_id, display_name, image_id, is_hydrated, kms_key_id, lifecycle_state, size_in_gbs, size_in_mbs, volume_group_id, vpus_per_gb, report_no'
+      for page in self.fan_out.pages( compute_client.list_instances, c.id):
+         yield 'instances', page
 
-      for bv in self.boot_volumes:
-         data += '\n'
-         data += f'{bv.id}, {bv.availability_domain}, {bv.compartment_id}, {bv.display_name}, {bv.image_id}, {bv.is_hydrated}, {bv.kms_key_id}, {bv.lifecycle_state}, {bv.size_in_gbs}, {bv.size_in_mbs}, {bv.volume_group_id}, {bv.vpus_per_gb}, {report_no}'
+      for page in self.fan_out.pages( compute_client.list_volume_attachments, c.id):
+         yield 'vol_attachments', page
 
-      write_file( data, 'boot_volume' )
+   def list_ad(self, unit):
+      region, c, ad = unit
+      compute_client = self.fan_out.client( oci.core.ComputeClient, self.signer, region.region_name )
 
-      # Block Volumes
-      data = 'id, availability_domain, compartment_id, display_name, is_hydrated, kms_key_id, lifecycle_state, size_in_gbs, size_in_mbs, volume_group_id, vpus_per_gb, report_no'
+      for page in self.fan_out.pages( compute_client.list_boot_volume_attachments, ad.name, c.id ):
+         yield 'bv_attachments', page
+               
+   def context(self):
+      return { 'tenancy_id': self.tenancy_id }
 
-      for bv in self.block_volumes:
-         data += '\n'
-         data += f'{bv.id}, {bv.availability_domain}, {bv.compartment_id}, {bv.display_name}, {bv.is_hydrated}, {bv.kms_key_id}, {bv.lifecycle_state}, {bv.size_in_gbs}, {bv.size_in_mbs}, {bv.volume_group_id}, {bv.vpus_per_gb}, {report_no}'
+class BlockStorage(Collector):
+   tables = {
+      'boot_volumes': Schema( 'boot_volume', [ 'id', 'availability_domain', 'compartment_id', 'display_name', 'image_id', 'is_hydrated', 'kms_key_id', 'lifecycle_state', 'size_in_gbs', 'size_in_mbs', 'volume_group_id', 'vpus_per_gb' ] ),
+      'block_volumes': Schema( 'block_volume', [ 'id', 'availability_domain', 'compartment_id', 'display_name', 'is_hydrated', 'kms_key_id', 'lifecycle_state', 'size_in_gbs', 'size_in_mbs', 'volume_group_id', 'vpus_per_gb' ] ),
+   }
 
-      write_file( data, 'block_volume' )
+   compartment_resources = [ 'Volume' ]
+   ad_resources = [ 'BootVolume' ]
 
-class DBSystem(object):
-   db_systems = []
-   db_homes = []
-   databases = []
-   dg_associations = []
-   autonomous_exadata = []
-   autonomous_cdb = []
-   autonomous_db = []
+   def __init__(self, config, tenancy, signer, fan_out=None, output=None):
+      self.signer = signer
+      self.init_tables()
+      self.output = output
+      self.fan_out = fan_out = fan_out or FanOut( config=config )
 
-   def __init__(self, config, tenancy, signer):
-      
-      for region in tenancy.regions:
-         signer.region = region.region_name
+      self.list_units( self.list_compartment, fan_out.compartment_units(tenancy, self.compartment_resources) )
 
-         db_client = oci.database.DatabaseClient(config={}, signer=signer)
+      self.list_units( self.list_ad, fan_out.ad_units(tenancy, self.ad_resources) )
 
-         for c in tenancy.get_compartments():           
-            self.db_systems += db_client.list_db_systems(c.id).data
+   def list_compartment(self, unit):
+      region, c = unit
+      block_storage_client = self.fan_out.client( oci.core.BlockstorageClient, self.signer, region.region_name )
 
-            db_homes = db_client.list_db_homes(c.id).data
-            self.db_homes += db_homes
+      for page in self.fan_out.pages( block_storage_client.list_volumes, compartment_id=c.id ):
+         yield 'block_volumes', page
 
-            for db_home in db_homes:
-               self.databases += db_client.list_databases(c.id, db_home_id=db_home.id).data
-            
-            # for db in databases:
-            #    self.dg_associations += db_client.list_data_guard_associations(db.id).data             
-           
-            self.autonomous_exadata += db_client.list_autonomous_exadata_infrastructures(c.id).data
-            
-            self.autonomous_cdb += db_client.list_autonomous_container_databases(c.id).data
+   def list_ad(self, unit):
+      region, c, ad = unit
+      block_storage_client = self.fan_out.client( oci.core.BlockstorageClient, self.signer, region.region_name )
+
+      for page in self.fan_out.pages( block_storage_client.list_boot_volumes, availability_domain=ad.name, compartment_id=c.id ):
+         yield 'boot_volumes', page
 
-            self.autonomous_db += db_client.list_autonomous_databases( c.id ).data
 
-   def create_csv(self):
-      # DB System
-      data = 'id, availability_domain, cluster_name, compartment_id, cpu_core_count, data_storage_percentage, data_storage_size_in_gbs, database_edition, disk_redundancy, display_name, domain, hostname, lifecycle_state, node_count, reco_storage_size_in_gb, shape, sparse_diskgroup, version, report_no'
+class DBSystem(Collector):
+   tables = {
+      'db_systems': Schema( 'db_system', [ 'id', 'availability_domain', 'cluster_name', 'compartment_id', 'cpu_core_count', 'data_storage_percentage', 'data_storage_size_in_gbs', 'database_edition', 'disk_redundancy', 'display_name', 'domain', 'hostname', 'lifecycle_state', 'node_count', 'reco_storage_size_in_gb', 'shape', 'sparse_diskgroup', 'version' ] ),
+      'db_homes': Schema( 'db_home', [ 'id', 'compartment_id', 'db_system_id', 'db_version', 'display_name', 'last_patch_history_entry_id', 'lifecycle_state' ] ),
+      'databases': Schema( 'database', [ 'id', 'compartment_id', ( 'auto_backup_enabled', db_backup_config( 'auto_backup_enabled', False ) ), ( 'auto_backup_window', db_backup_config( 'auto_backup_window' ) ),
+                                        ( 'backup_destination_details', db_backup_config( 'backup_destination_details' ) ), ( 'recovery_window_in_days', db_backup_config( 'recovery_window_in_days' ) ),
+                                        'db_home_id', 'db_name', 'db_unique_name', 'db_workload', 'lifecycle_state', 'pdb_name' ] ),
+      'autonomous_exadata': Schema( 'autonomous_exadata', [ 'id', 'availability_domain', 'compartment_id', 'display_name', 'domain', 'hostname', 'last_maintenance_run_id', 'license_model', 'lifecycle_state', 'maintenance_window', 'next_maintenance_run_id', 'shape' ] ),
+      'autonomous_cdb': Schema( 'autonomous_cdb', [ 'id', 'autonomous_exadata_infrastructure_id', 'availability_domain', 'backup_config', 'compartment_id', 'display_name', 'last_maintenance_run_id', 'lifecycle_state', 'maintenance_window', 'next_maintenance_run_id', 'patch_model', 'service_level_agreement_type' ] ),
+      'autonomous_db': Schema( 'autonomous_db', [ 'id', 'autonomous_container_database_id', 'compartment_id', 'cpu_core_count', 'data_safe_status', 'data_storage_size_in_tbs', 'db_name', 'db_version', 'db_workload', 'display_name', 'is_auto_scaling_enabled', 'is_dedicated', 'is_free_tier', 'lifecycle_state', 'whitelisted_ips' ] ),
+      'dg_associations': Schema( 'dg_association', [ 'id', 'database_id', 'role', 'lifecycle_state', 'peer_role', 'peer_database_id', 'peer_db_system_id', 'protection_mode', 'transport_type', 'apply_lag', 'time_created' ] ),
+      'backups': Schema( 'db_backup', [ 'id', 'compartment_id', 'database_id', 'display_name', 'type', 'lifecycle_state', 'availability_domain', 'database_size_in_gbs', 'time_started', 'time_ended' ] ),
+   }
+
+   # homes and databases go with the DB systems, and with the Exadata VM clusters - homes there belong to no DB system
+   compartment_resources = [ 'DbSystem', 'CloudVmCluster', 'VmCluster', 'AutonomousDatabase', 'AutonomousContainerDatabase', 'AutonomousExadataInfrastructure' ]
+
+   # detail tables collected once the databases are known - Data Guard associations per database, backups per compartment
+   optional_tables = { 'dg_associations', 'backups' }
+   details = optional_tables
+
+   def __init__(self, config, tenancy, signer, fan_out=None, output=None, details=None):
+      self.signer = signer
+      self.init_tables()
+      self.output = output
+      self.fan_out = fan_out = fan_out or FanOut( config=config )
+
+      if details is not None:
+         self.details = set( details )
+
+      # the API only lists databases by home, so every home is a unit of its own rather than a loop inside its compartment
+      homes = []
+      for ( region, c ), table, rows in self.stream( self.list_compartment, fan_out.compartment_units(tenancy, self.compartment_resources) ):
+         if table == 'db_homes':
+            homes += [ ( region, c, db_home.id ) for db_home in rows ]
+
+      databases = []
+      for ( region, c, db_home_id ), table, rows in self.stream( self.list_home, homes ):
+         databases += [ ( region, c, db.id ) for db in rows ]
+
+      if 'backups' in self.details:
+         compartments = { unit_key( region, c ): ( region, c ) for region, c, database_id in databases }
+
+         self.list_units( self.list_backups, list( compartments.values() ) )
+
+      if 'dg_associations' in self.details:
+         self.list_units( self.list_dg_associations, databases )
+
+   def list_compartment(self, unit):
+      region, c = unit
+      db_client = self.fan_out.client( oci.database.DatabaseClient, self.signer, region.region_name )
+
+      for page in self.fan_out.pages( db_client.list_db_systems, c.id):
+         yield 'db_systems', page
+
+      for page in self.fan_out.pages( db_client.list_db_homes, c.id):
+         yield 'db_homes', page
+
+      for page in self.fan_out.pages( db_client.list_autonomous_exadata_infrastructures, c.id):
+         yield 'autonomous_exadata', page
+
+      for page in self.fan_out.pages( db_client.list_autonomous_container_databases, c.id):
+         yield 'autonomous_cdb', page
+
+      for page in self.fan_out.pages( db_client.list_autonomous_databases, c.id ):
+         yield 'autonomous_db', page
+
+   def list_home(self, unit):
+      region, c, db_home_id = unit
+      db_client = self.fan_out.client( oci.database.DatabaseClient, self.signer, region.region_name )
 
-      for db_system in self.db_systems:
-         data += '\n'
-         data += f'{db_system.id}, {db_system.availability_domain}, {db_system.cluster_name}, {db_system.compartment_id}, {db_system.cpu_core_count}, {db_system.data_storage_percentage}, {db_system.data_storage_size_in_gbs}, {db_system.database_edition}, {db_system.disk_redundancy}, {db_system.display_name}, {db_system.domain}, {db_system.hostname}, {db_system.lifecycle_state}, {db_system.node_count}, {db_system.reco_storage_size_in_gb}, {db_system.shape}, {db_system.sparse_diskgroup}, {db_system.version}, {report_no}'
-      
-      write_file( data, 'db_system' )
+      for page in self.fan_out.pages( db_client.list_databases, c.id, db_home_id=db_home_id):
+         yield 'databases', page
+
+   def list_backups(self, unit):
+      # one listing for every backup of the compartment, rather than one per database
+      region, c = unit
+      db_client = self.fan_out.client( oci.database.DatabaseClient, self.signer, region.region_name )
 
-      # DB Home
-      data = 'id, compartment_id, db_system_id, db_version, display_name, last_patch_history_entry_id, lifecycle_state, report_no'
+      for page in self.fan_out.pages( db_client.list_backups, compartment_id=c.id ):
+         yield 'backups', page
+
+   def list_dg_associations(self, unit):
+      region, c, database_id = unit
+      db_client = self.fan_out.client( oci.database.DatabaseClient, self.signer, region.region_name )
+
+      for page in self.fan_out.pages( db_client.list_data_guard_associations, database_id ):
+         yield 'dg_associations', page
+
+##########################################################################
+# Uploads to the PAR
+###########################################################################
+class Uploader(object):
+   max_workers = 4
+   pool_size = 8
+   multipart_threshold = 64 * 1024 * 1024
+   part_size = 16 * 1024 * 1024
+   max_retries = 4
+   base_backoff = 1.0
+
+   def __init__(self, par_url, max_workers=None, profiler=None):
+      self.par_url = par_url
+      self.profiler = profiler or Profiler()
+      url = urllib.parse.urlsplit( par_url )
+      self.host = f'{url.scheme}://{url.netloc}'
+
+      # one pooled session for every upload, so connections are reused instead of a TLS handshake per file
+      self.session = requests.Session()
+      adapter = requests.adapters.HTTPAdapter( pool_connections=1, pool_maxsize=self.pool_size )
+      self.session.mount( 'https://', adapter )
+      self.session.mount( 'http://', adapter )
 
-      for db_home in self.db_homes:
-         data += '\n'
-         data += f'{db_home.id}, {db_home.compartment_id}, {db_home.db_system_id}, {db_home.db_version}, {db_home.display_name}, {db_home.last_patch_history_entry_id}, {db_home.lifecycle_state}, {report_no}'
+      self.executor = ThreadPoolExecutor( max_workers=max_workers or self.max_workers )
+      self.futures = []
 
-      write_file( data, 'db_home' )
-      
-      # Database
-      data = 'id, compartment_id, auto_backup_enabled, auto_backup_window, backup_destination_details, recovery_window_in_days, db_home_id, db_name, db_unique_name, db_workload, lifecycle_state, pdb_name, report_no'
+   def submit(self, file, object_name):
+      self.futures.append( self.executor.submit( self.upload, file, object_name ) )
+
+   def wait(self):
+      # returns the names of the objects that could not be uploaded
+      failed = [ f.result() for f in self.futures if f.result() ]
+      self.futures = []
+      return failed
 
-      for db in self.databases:
-         data += '\n'
-         db_auto_backup_enabled = 'False' if db.db_backup_config == None else db.db_backup_config.auto_backup_enabled
-         db_auto_backup_window  = 'None' if db.db_backup_config == None else {db.db_backup_config.auto_backup_window}
-         db_backup_destination_details  = 'None' if db.db_backup_config == None else {db.db_backup_config.backup_destination_details}
-         db_recovery_window_in_days = 'None' if db.db_backup_config == None else {db.db_backup_config.recovery_window_in_days}
+   def close(self):
+      self.wait()
+      self.executor.shutdown()
+      self.session.close()
 
-         data += f'{db.id}, {db.compartment_id}, {db_auto_backup_enabled}, {db_auto_backup_window}, {db_backup_destination_details}, {db_recovery_window_in_days}, {db.db_home_id}, {db.db_name}, {db.db_unique_name}, {db.db_workload}, {db.lifecycle_state}, {db.pdb_name}, {report_no}'
+   def upload(self, file, object_name):
+      started = time.monotonic()
+      size = 0
 
-      write_file( data, 'database' )
+      try:
+         size = file.seek( 0, io.SEEK_END )
 
-      # DG Association
-      # for db in self.databases:
-      #    create_csv( f'' )
+         if size > self.multipart_threshold:
+            self.upload_multipart( file, object_name, size )
+         else:
+            self.retry( self.put_file, f'{self.par_url}{object_name}', file, size )
 
-      # Autonomous Exadata
-      data = 'id, availability_domain, compartment_id, display_name, domain, hostname, last_maintenance_run_id, license_model, lifecycle_state, maintenance_window, next_maintenance_run_id, shape, report_no'
+         self.profiler.upload( object_name, time.monotonic() - started, size, True )
+         return None
+      except Exception:
+         logger.exception( f'failed to write file : {object_name}' )
+         self.profiler.upload( object_name, time.monotonic() - started, size, False )
+         return object_name
+      finally:
+         file.close()
+
+   def put_file(self, url, file, size):
+      file.seek( 0 )
+
+      # files still held in memory are sent as they are, larger ones are streamed from disk
+      if size <= CsvWriter.spool_size:
+         data = file.read()
+      else:
+         data = file
 
-      for auto_exadata in self.autonomous_exadata:
-         data += '\n'
-         data += f'{auto_exadata.id}, {auto_exadata.availability_domain}, {auto_exadata.compartment_id}, {auto_exadata.display_name}, {auto_exadata.domain}, {auto_exadata.hostname}, {auto_exadata.last_maintenance_run_id}, {auto_exadata.license_model}, {auto_exadata.lifecycle_state}, {auto_exadata.maintenance_window}, {auto_exadata.next_maintenance_run_id}, {auto_exadata.shape}, {report_no}'
+      self.session.put( url, data=data ).raise_for_status()
 
-      write_file( data, 'autonomous_exadata' )
+   def upload_multipart(self, file, object_name, size):
+      resp = self.retry( self.session.put, f'{self.par_url}{object_name}', headers={ 'opc-multipart': 'true' } )
+      upload_url = f'{self.host}{resp.json()[ "accessUri" ]}'
 
-      # Autonomous Container DB
-      data = 'id, autonomous_exadata_infrastructure_id, availability_domain, backup_config, compartment_id, display_name, last_maintenance_run_id, lifecycle_state, maintenance_window, next_maintenance_run_id, patch_model, service_level_agreement_type, report_no'
+      try:
+         for part_num, offset in enumerate( range( 0, size, self.part_size ), start=1 ):
+            self.retry( self.put_part, f'{upload_url}{part_num}', file, offset )
 
-      for acdb in self.autonomous_cdb:
-         data += '\n'
-         data += f'{acdb.id}, {acdb.autonomous_exadata_infrastructure_id}, {acdb.availability_domain}, {acdb.backup_config}, {acdb.compartment_id}, {acdb.display_name}, {acdb.last_maintenance_run_id}, {acdb.lifecycle_state}, {acdb.maintenance_window}, {acdb.next_maintenance_run_id}, {acdb.patch_model}, {acdb.service_level_agreement_type}, {report_no}'
+         self.retry( self.session.post, upload_url )
+      except Exception:
+         self.session.delete( upload_url )
+         raise
 
-      write_file( data, 'autonomous_cdb' )
+   def put_part(self, url, file, offset):
+      file.seek( offset )
+      self.session.put( url, data=file.read( self.part_size ) ).raise_for_status()
 
-      # Autonomous DB     
-      data = 'id, autonomous_container_database_id, compartment_id, cpu_core_count, data_safe_status, data_storage_size_in_tbs, db_name, db_version, db_workload, display_name, is_auto_scaling_enabled, is_dedicated, is_free_tier, lifecycle_state, whitelisted_ips, report_no'
-      
-      for adb in self.autonomous_db:
-         data += '\n'
-         data += f'{adb.id}, {adb.autonomous_container_database_id}, {adb.compartment_id}, {adb.cpu_core_count}, {adb.data_safe_status},  {adb.data_storage_size_in_tbs}, {adb.db_name}, {adb.db_version}, {adb.db_workload}, {adb.display_name}, {adb.is_auto_scaling_enabled}, {adb.is_dedicated}, {adb.is_free_tier}, {adb.lifecycle_state}, {adb.whitelisted_ips}, {report_no}'
+   def retry(self, fn, *args, **kwargs):
+      for attempt in range( self.max_retries + 1 ):
+         try:
+            resp = fn( *args, **kwargs )
 
-      write_file( data, 'autonomous_db' )
+            if resp is not None:
+               resp.raise_for_status()
 
-def write_file( strdata, filename ):
-   global report_no
-   global par_url
+            return resp
+         except requests.exceptions.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            if attempt == self.max_retries or ( status and status < 500 and status != 429 ):
+               raise
 
-   try:
-      resp = requests.put( f'{par_url}{filename}_{report_no}.csv', data=strdata.encode('utf-8'))
-      #logger.info( f'{par_url}{filename}_{report_no}.csv - file written')
-   except Exception:
-      logger.Error( f'failed to write file : {filename}_{report_no}')
-      logger.Error( resp )
+            logger.warning( f'upload attempt {attempt + 1} failed : {e}' )
+            time.sleep( random.uniform( 0, self.base_backoff * 2 ** attempt ) )
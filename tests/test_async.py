@@ -0,0 +1,36 @@
+import oci
+import pytest
+import oci_services
+from benchmark import write_config
+
+oci_async = pytest.importorskip( 'oci_async' )
+
+##########################################################################
+# AsyncFanOut requests - the URLs and signatures the SDK clients would send
+###########################################################################
+@pytest.fixture
+def config( tmp_path ):
+   return oci.config.from_file( write_config( str( tmp_path ), 'http://127.0.0.1:1/p/local/', 'us-ashburn-1' ) )
+
+def async_fan_out( config, endpoint=None ):
+   signer = oci.signer.Signer( config[ 'tenancy' ], config[ 'user' ], config[ 'fingerprint' ], config[ 'key_file' ] )
+   return oci_async.AsyncFanOut( oci_services.FanOut( endpoint=endpoint, config=config ), signer, None )
+
+# the Compute and Block Storage endpoints of the SDK are host templates - iaas.<region>.{dualStack?ds.oci.:}oraclecloud.com
+@pytest.mark.parametrize( 'client_class, path, url', [
+   ( oci.core.ComputeClient, '/instances', 'https://iaas.us-ashburn-1.oraclecloud.com/20160918/instances?compartmentId=c1' ),
+   ( oci.core.BlockstorageClient, '/volumes', 'https://iaas.us-ashburn-1.oraclecloud.com/20160918/volumes?compartmentId=c1' ),
+   ( oci.database.DatabaseClient, '/dbHomes', 'https://database.us-ashburn-1.oraclecloud.com/20160918/dbHomes?compartmentId=c1' ),
+] )
+def test_region_endpoint_is_resolved( config, client_class, path, url ):
+   fan_out = async_fan_out( config )
+   client = fan_out.fan_out.client( client_class, fan_out.signer, 'us-ashburn-1' )
+
+   assert fan_out.url( client, path, { 'compartmentId': 'c1' } ) == url
+   assert fan_out.signed_headers( url )[ 'host' ] == url.split( '/' )[2]
+
+def test_service_endpoint_is_kept( config ):
+   fan_out = async_fan_out( config, 'http://127.0.0.1:8000' )
+   client = fan_out.fan_out.client( oci.core.ComputeClient, fan_out.signer, 'us-ashburn-1' )
+
+   assert fan_out.url( client, '/instances', { 'compartmentId': 'c1' } ) == 'http://127.0.0.1:8000/us-ashburn-1/20160918/instances?compartmentId=c1'
@@ -0,0 +1,35 @@
+import pytest
+import oci_services
+
+##########################################################################
+# extract_target - report_no, and so the object names, of the tenancies of a batch
+###########################################################################
+class Service(object):
+   # stands in for OCIService - records the report_no of every run
+   runs = []
+
+   def __init__(self, authentication, profile, **kwargs):
+      self.config = { 'tenancy': f'ocid1.tenancy.oc1..{profile}' }
+
+   def extract_data(self, report_no):
+      self.runs.append( report_no )
+      return []
+
+@pytest.fixture
+def runs( monkeypatch ):
+   monkeypatch.setattr( oci_services, 'OCIService', Service )
+   monkeypatch.setattr( oci_services.time, 'gmtime', lambda: oci_services.time.struct_time( ( 2026, 10, 18, 14, 27, 49, 6, 291, 0 ) ) )
+   Service.runs = []
+   return Service.runs
+
+def test_targets_started_together_get_their_own_report_no( runs ):
+   summaries = [ oci_services.extract_target( { 'profile': profile } ) for profile in [ 'prod', 'dev', 'prod/eu 1' ] ]
+
+   assert [ s[ 'report_no' ] for s in summaries ] == runs == [ '2026-10-18T14-27-49Z_prod', '2026-10-18T14-27-49Z_dev', '2026-10-18T14-27-49Z_prod-eu-1' ]
+   assert oci_services.extract_target( { 'profile': 'prod', 'authentication': 'INSTANCE' } )[ 'report_no' ] == '2026-10-18T14-27-49Z_instance_prod'
+
+def test_resumed_run_keeps_its_report_no( runs ):
+   summary = oci_services.extract_target( { 'profile': 'prod', 'report_no': '2026-10-17T08-00-00Z_prod' } )
+
+   assert summary[ 'report_no' ] == runs[0] == '2026-10-17T08-00-00Z_prod'
+   assert summary[ 'error' ] is None
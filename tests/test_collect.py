@@ -0,0 +1,78 @@
+import pytest
+import oci_services
+from benchmark import TENANCY_ID, write_config
+from mock_oci import MockOciServer
+
+##########################################################################
+# OCIService.collect() against the mock OCI endpoint - the blocking and the async collectors
+# must return the same records, whatever the paging and throttling
+###########################################################################
+PAGE_SIZE = 2
+
+@pytest.fixture
+def fast_retries( monkeypatch ):
+   # keep the backoff of the retries short
+   monkeypatch.setattr( oci_services.RateLimits, 'base_backoff', 0.01 )
+
+@pytest.fixture
+def oci_server():
+   server = MockOciServer( page_size=PAGE_SIZE ).start()
+   server.populate( TENANCY_ID, regions=2, compartments=3, ads=2, instances=3, volumes=3, databases=2, limit_services=2, limits=3 )
+   yield server
+   server.stop()
+
+@pytest.fixture
+def config_file( oci_server, tmp_path ):
+   # collect() uploads nothing, the PAR is never called
+   return write_config( str( tmp_path ), 'http://127.0.0.1:1/p/local/', oci_server.region_names[0] )
+
+def collect( config_file, oci_server, **kwargs ):
+   service = oci_services.OCIService( 'CONFIG', config_file=config_file, service_endpoint=oci_server.endpoint, metadata_cache_path=None, journal_path=None,
+                                      initial_rate=50, **kwargs )
+   return service.collect()
+
+def test_collect_follows_pages( oci_server, config_file ):
+   records = collect( config_file, oci_server )
+
+   # 2 regions x 3 compartments x 2 ADs, listed PAGE_SIZE records at a time
+   assert len( records[ 'instance' ] ) == 2 * 3 * 2 * 3 > PAGE_SIZE
+   assert len( records[ 'block_volume' ] ) == 2 * 3 * 2 * 3
+   assert len( records[ 'database' ] ) == len( records[ 'dg_association' ] ) == len( records[ 'db_backup' ] ) == 2 * 3 * 2 * 2
+   assert len( records[ 'compartment' ] ) == 1 + 3
+   assert len( records[ 'limit' ] ) == 2 * 2 * 3
+   assert len( { r.instance_id for r in records[ 'instance' ] } ) == len( records[ 'instance' ] )
+
+def test_async_matches_sync( oci_server, config_file ):
+   sync_records = collect( config_file, oci_server )
+   async_records = collect( config_file, oci_server, async_mode=True )
+
+   assert sync_records.keys() == async_records.keys()
+   for table in sync_records:
+      assert async_records[ table ] == sync_records[ table ], table
+
+@pytest.mark.parametrize( 'async_mode', [ False, True ] )
+def test_throttled_calls_are_retried( oci_server, config_file, fast_retries, async_mode ):
+   expected = collect( config_file, oci_server )
+
+   oci_server.throttle_rate = 0.05
+   oci_server.throttled = 0
+   records = collect( config_file, oci_server, async_mode=async_mode )
+
+   assert oci_server.throttled > 0
+   assert records == expected
+
+@pytest.mark.parametrize( 'async_mode', [ False, True ] )
+def test_discovery_keeps_homes_on_vm_clusters( oci_server, config_file, async_mode ):
+   # a home on an Exadata VM cluster, in a compartment without a DB system
+   region_name = oci_server.region_names[0]
+   common = { 'compartmentId': 'ocid1.compartment.oc1..exadata', 'lifecycleState': 'AVAILABLE' }
+   oci_server.add( region_name, 'compartments', [ { 'id': 'ocid1.compartment.oc1..exadata', 'name': 'exadata', 'description': 'synthetic', 'compartmentId': TENANCY_ID, 'lifecycleState': 'ACTIVE' } ] )
+   oci_server.add( region_name, 'cloudVmClusters', [ dict( common, id='ocid1.cloudvmcluster.exadata', displayName='cluster' ) ] )
+   oci_server.add( region_name, 'dbHomes', [ dict( common, id='ocid1.dbhome.exadata', displayName='home', vmClusterId='ocid1.cloudvmcluster.exadata', dbVersion='19.0.0.0' ) ] )
+   oci_server.add( region_name, 'databases', [ dict( common, id='ocid1.database.exadata', dbHomeId='ocid1.dbhome.exadata', dbName='EXA', dbBackupConfig=None ) ] )
+
+   records = collect( config_file, oci_server, discovery=True, async_mode=async_mode )
+
+   assert 'ocid1.dbhome.exadata' in { r.id for r in records[ 'db_home' ] }
+   assert 'ocid1.database.exadata' in { r.id for r in records[ 'database' ] }
+   assert records == collect( config_file, oci_server, async_mode=async_mode )
@@ -0,0 +1,41 @@
+import os
+import pytest
+import oci_services
+from benchmark import TENANCY_ID, write_config
+from mock_oci import MockOciServer, MockParServer
+
+##########################################################################
+# OCIService.extract_data() against the mock endpoint and PAR - where a run keeps its state
+###########################################################################
+@pytest.fixture
+def servers( tmp_path ):
+   oci_server = MockOciServer().start()
+   oci_server.populate( TENANCY_ID, regions=1, compartments=2, ads=1, instances=1, volumes=1, databases=1, limit_services=1, limits=1 )
+   par_server = MockParServer().start()
+   yield oci_server, par_server
+   oci_server.stop()
+   par_server.stop()
+
+def extract( tmp_path, servers, **kwargs ):
+   oci_server, par_server = servers
+   config_file = write_config( str( tmp_path ), par_server.par_url, oci_server.region_names[0] )
+   service = oci_services.OCIService( 'CONFIG', config_file=config_file, service_endpoint=oci_server.endpoint, state_dir=str( tmp_path / 'state' ), **kwargs )
+   return service.extract_data()
+
+def test_state_files_stay_out_of_the_working_directory( tmp_path, servers, monkeypatch ):
+   work = tmp_path / 'work'
+   work.mkdir()
+   monkeypatch.chdir( work )
+
+   assert extract( tmp_path, servers, incremental=True ) == []
+   assert os.listdir( work ) == []
+
+   # the journal is off unless asked for
+   state = os.listdir( tmp_path / 'state' )
+   assert 'oci_snapshot.db' in state
+   assert any( name.startswith( 'oci_metadata_cache' ) for name in state )
+   assert not any( name.startswith( 'oci_journal' ) for name in state )
+
+def test_journal_is_opt_in( tmp_path, servers ):
+   assert extract( tmp_path, servers, journal_path='oci_journal.db' ) == []
+   assert os.path.exists( tmp_path / 'state' / 'oci_journal.db' )
@@ -0,0 +1,81 @@
+import logging
+import queue
+import threading
+import time
+import oci_services
+
+##########################################################################
+# The log pipeline - DroppingQueueHandler and BatchingQueueListener
+###########################################################################
+class SlowSink(logging.Handler):
+   # a sink that falls behind, so that the buffer fills up
+   def __init__(self, delay=0.001):
+      super().__init__()
+      self.delay = delay
+      self.messages = []
+
+   def emit(self, record):
+      time.sleep( self.delay )
+      self.messages.append( record.getMessage() )
+
+def pipeline( queue_size, drop, sink ):
+   q = queue.Queue( queue_size )
+   queue_handler = oci_services.DroppingQueueHandler( q, drop )
+   listener = oci_services.BatchingQueueListener( q, sink, queue_handler, batch_size=10, flush_interval=0.05 )
+
+   log = logging.getLogger( f'test_logging.{id( listener )}' )
+   log.propagate = False
+   log.addHandler( queue_handler )
+   listener.start()
+   return log, queue_handler, listener
+
+def test_records_are_shipped_on_stop():
+   sink = SlowSink( 0 )
+   log, queue_handler, listener = pipeline( 100, 'oldest', sink )
+
+   for n in range( 50 ):
+      log.warning( f'record {n}' )
+   listener.stop()
+
+   assert sink.messages == [ f'record {n}' for n in range( 50 ) ]
+
+def test_newest_dropped_when_full():
+   sink = SlowSink()
+   log, queue_handler, listener = pipeline( 5, 'newest', sink )
+
+   for n in range( 1000 ):
+      log.warning( f'record {n}' )
+   listener.stop()
+
+   assert queue_handler.dropped > 0
+   assert any( 'log records dropped' in message for message in sink.messages )
+
+def test_stop_with_full_buffer_and_threads_logging():
+   # drop='oldest' used to drop the sentinel of stop() - the listener then never returned
+   sink = SlowSink()
+   log, queue_handler, listener = pipeline( 10, 'oldest', sink )
+   running = threading.Event()
+   running.set()
+
+   def flood():
+      while running.is_set():
+         log.warning( 'flood' )
+
+   threads = [ threading.Thread( target=flood, daemon=True ) for _ in range( 4 ) ]
+   for thread in threads:
+      thread.start()
+
+   while queue_handler.dropped == 0:
+      time.sleep( 0.01 )
+
+   stopper = threading.Thread( target=listener.stop, daemon=True )
+   stopper.start()
+   stopper.join( 10 )
+   stopped = not stopper.is_alive()
+
+   running.clear()
+   for thread in threads:
+      thread.join()
+
+   assert stopped
+   assert sink.messages
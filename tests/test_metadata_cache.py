@@ -0,0 +1,56 @@
+import oci_services
+
+##########################################################################
+# MetadataCache - cached entities and their invalidation
+###########################################################################
+TENANCIES = [ 'ocid1.tenancy.oc1..aaa', 'ocid1.tenancy.oc1..aaab' ]
+
+def cache_with_entries( tmp_path ):
+   cache = oci_services.MetadataCache( str( tmp_path / 'cache' ) )
+   for tenancy_id in TENANCIES:
+      for entity in [ 'regions', 'compartments' ]:
+         cache.get( tenancy_id, entity, 'key', lambda: 'cached' )
+
+   return cache
+
+def cached( cache ):
+   # the entries that are still served without a fetch
+   return { ( tenancy_id, entity ) for tenancy_id in TENANCIES for entity in [ 'regions', 'compartments' ] if cache.get( tenancy_id, entity, 'key', lambda: None ) == 'cached' }
+
+def test_get_fetches_once( tmp_path ):
+   cache = oci_services.MetadataCache( str( tmp_path / 'cache' ) )
+   fetched = []
+
+   for _ in range( 3 ):
+      assert cache.get( TENANCIES[0], 'regions', '', lambda: fetched.append( 1 ) or 'regions' ) == 'regions'
+
+   assert fetched == [ 1 ]
+   cache.close()
+
+def test_invalidate_entity_only( tmp_path ):
+   cache = cache_with_entries( tmp_path )
+   cache.invalidate( entity='compartments' )
+
+   assert cached( cache ) == { ( tenancy_id, 'regions' ) for tenancy_id in TENANCIES }
+   cache.close()
+
+def test_invalidate_tenancy_is_not_a_prefix( tmp_path ):
+   cache = cache_with_entries( tmp_path )
+   cache.invalidate( TENANCIES[0] )
+
+   assert cached( cache ) == { ( TENANCIES[1], 'regions' ), ( TENANCIES[1], 'compartments' ) }
+   cache.close()
+
+def test_invalidate_tenancy_and_entity( tmp_path ):
+   cache = cache_with_entries( tmp_path )
+   cache.invalidate( TENANCIES[1], 'regions' )
+
+   assert cached( cache ) == { ( TENANCIES[0], 'regions' ), ( TENANCIES[0], 'compartments' ), ( TENANCIES[1], 'compartments' ) }
+   cache.close()
+
+def test_invalidate_all( tmp_path ):
+   cache = cache_with_entries( tmp_path )
+   cache.invalidate()
+
+   assert cached( cache ) == set()
+   cache.close()
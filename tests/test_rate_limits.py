@@ -0,0 +1,78 @@
+import email.utils
+import time
+import pytest
+import oci_services
+from oci_services import RateLimiter, parse_retry_after
+
+##########################################################################
+# RateLimiter and parse_retry_after
+###########################################################################
+def test_success_increases_additively():
+   limiter = RateLimiter( 10.0 )
+   for _ in range( 10 ):
+      limiter.success()
+
+   assert 10.9 < limiter.rate < 11.0
+
+   limiter.rate = limiter.max_rate
+   limiter.success()
+   assert limiter.rate == limiter.max_rate
+
+def test_throttled_halves_down_to_min_rate():
+   limiter = RateLimiter( 10.0 )
+   limiter.throttled()
+   assert limiter.rate == 5.0
+
+   for _ in range( 10 ):
+      limiter.throttled()
+   assert limiter.rate == limiter.min_rate
+
+def test_burst_of_429s_halves_once():
+   # 8 requests in flight, all answered with a 429 after the first one halved the rate
+   limiter = RateLimiter( 10.0 )
+   sent = time.monotonic()
+   for _ in range( 8 ):
+      limiter.throttled( sent=sent )
+
+   assert limiter.rate == 5.0
+
+   # a request sent once the rate was halved is throttled at the new rate
+   limiter.throttled( sent=time.monotonic() )
+   assert limiter.rate == 2.5
+
+def test_retry_after_blocks_reserve():
+   limiter = RateLimiter( 10.0 )
+   limiter.throttled( 5.0, time.monotonic() )
+
+   assert 4.0 < limiter.reserve() <= 5.0
+
+   # a stale 429 still honours its Retry-After
+   limiter.throttled( 8.0, 0.0 )
+   assert limiter.rate == 5.0
+   assert 7.0 < limiter.reserve() <= 8.0
+
+def test_reserve_paces_at_rate( monkeypatch ):
+   now = [ 100.0 ]
+   monkeypatch.setattr( oci_services.time, 'monotonic', lambda: now[0] )
+
+   limiter = RateLimiter( 4.0 )
+   assert limiter.reserve() == 0
+   assert limiter.reserve() == pytest.approx( 0.25 )
+
+   now[0] += 0.25
+   assert limiter.reserve() == 0
+
+@pytest.mark.parametrize( 'headers, seconds', [
+   ( None, None ),
+   ( {}, None ),
+   ( { 'retry-after': '2' }, 2.0 ),
+   ( { 'Retry-After': '0.5' }, 0.5 ),
+   ( { 'retry-after': 'soon' }, None ),
+   ( { 'retry-after': email.utils.formatdate( 0, usegmt=True ) }, 0.0 ),
+] )
+def test_parse_retry_after( headers, seconds ):
+   assert parse_retry_after( headers ) == seconds
+
+def test_parse_retry_after_http_date():
+   header = email.utils.formatdate( time.time() + 30, usegmt=True )
+   assert 28.0 < parse_retry_after( { 'retry-after': header } ) <= 30.0
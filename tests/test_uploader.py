@@ -0,0 +1,101 @@
+import io
+import random
+import pytest
+import oci_services
+from mock_oci import MockParServer
+
+##########################################################################
+# Uploader against the local PAR stand-in - single and multipart uploads, retries and aborts
+###########################################################################
+PART_SIZE = 1024
+
+@pytest.fixture
+def par_server():
+   server = MockParServer().start()
+   yield server
+   server.stop()
+
+@pytest.fixture
+def uploader( par_server ):
+   uploader = oci_services.Uploader( par_server.par_url )
+   uploader.multipart_threshold = 2 * PART_SIZE
+   uploader.part_size = PART_SIZE
+   uploader.base_backoff = 0.01
+   yield uploader
+   uploader.close()
+
+def parts( count ):
+   # every part is filled with a byte of its own, so parts out of order show in the object
+   return b''.join( bytes( [ n ] ) * PART_SIZE for n in range( count ) ) + b'tail'
+
+def test_small_file_is_one_put( par_server, uploader ):
+   uploader.submit( io.BytesIO( b'id,name\n1,a\n' ), 'table_1.csv' )
+
+   assert uploader.wait() == []
+   assert par_server.objects == { 'table_1.csv': b'id,name\n1,a\n' }
+   assert par_server.requests == 1
+
+def test_multipart_parts_in_order_and_committed( par_server, uploader ):
+   data = parts( 5 )
+   uploader.submit( io.BytesIO( data ), 'big_1.csv' )
+
+   assert uploader.wait() == []
+   assert par_server.objects[ 'big_1.csv' ] == data
+   assert par_server.uploads == {}
+
+   # start, 6 parts and the commit
+   assert par_server.requests == 1 + 6 + 1
+
+def test_multipart_aborted_on_failure( par_server, uploader ):
+   put_part = uploader.put_part
+
+   def failing_put_part( url, file, offset ):
+      # every request from the first part on is refused
+      par_server.fail_rate = 1.0
+      par_server.fail_status = 400
+      return put_part( url, file, offset )
+
+   uploader.put_part = failing_put_part
+   uploader.submit( io.BytesIO( parts( 5 ) ), 'big_1.csv' )
+
+   assert uploader.wait() == [ 'big_1.csv' ]
+   assert 'big_1.csv' not in par_server.objects
+   assert par_server.uploads == {}
+
+   # start and one refused part, which is not retried
+   assert par_server.requests == 2
+
+def test_503_is_retried( par_server, uploader ):
+   random.seed( 5 )
+   par_server.fail_rate = 0.4
+   uploader.max_retries = 12
+   files = { f'table_{n}.csv': f'id\n{n}\n'.encode( 'utf-8' ) for n in range( 10 ) }
+
+   for name, data in files.items():
+      uploader.submit( io.BytesIO( data ), name )
+
+   assert uploader.wait() == []
+   assert par_server.objects == files
+   assert par_server.failures > 0
+   assert par_server.requests == len( files ) + par_server.failures
+
+def test_multipart_503_is_retried( par_server, uploader ):
+   random.seed( 7 )
+   par_server.fail_rate = 0.3
+   uploader.max_retries = 12
+   data = parts( 5 )
+   uploader.submit( io.BytesIO( data ), 'big_1.csv' )
+
+   assert uploader.wait() == []
+   assert par_server.objects[ 'big_1.csv' ] == data
+   assert par_server.failures > 0
+
+@pytest.mark.parametrize( 'status', [ 400, 403, 404 ] )
+def test_4xx_is_not_retried( par_server, uploader, status ):
+   par_server.fail_rate = 1.0
+   par_server.fail_status = status
+   uploader.submit( io.BytesIO( b'id\n1\n' ), 'table_1.csv' )
+
+   assert uploader.wait() == [ 'table_1.csv' ]
+   assert par_server.objects == {}
+   assert par_server.requests == 1